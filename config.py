@@ -3,4 +3,50 @@ use_system_assets: bool = True
 piston_api_route: str = "/api/v2"
 piston_api_url: str = "http://localhost:2000" + piston_api_route
 
+# code executions, see src/types/piston.py
+piston_catalog_refresh: float = 60 * 10  # seconds between refreshing installed runtimes
+piston_concurrency: int = 4
+piston_user_concurrency: int = 1  # executions running at once per user
+piston_user_limit: int = 3  # executions queued or running per user
+piston_cache_size: int = 256  # results of deterministic executions, eg. `math`
+piston_cache_ttl: float = 60 * 60  # seconds
+
 chrome_path: str = r"C:\Program Files\Google\Chrome\Application\chrome.exe"
+
+# asyncpg pool, see src/types/pool.py
+psql_pool_min_size: int = 2
+psql_pool_max_size: int = 10
+psql_max_inactive_connection_lifetime: float = 300  # seconds
+psql_command_timeout: float = 10  # seconds
+psql_statement_cache_size: int = 256
+
+# cache of GET responses from external APIs, see src/types/http.py
+http_cache_size: int = 512
+http_cache_dir: str | None = None  # eg. ".cache/http" to keep responses across restarts
+
+# ffmpeg jobs for media edits, see src/types/ffmpeg.py
+ffmpeg_concurrency: int | None = None  # defaults to the number of CPUs
+ffmpeg_user_limit: int = 3  # jobs queued or running per user
+ffmpeg_timeout: float = 120  # seconds
+
+# results of media edits, see src/types/media_cache.py
+media_cache_dir: str | None = ".cache/media"  # None to disable
+media_cache_size: int = 512 * 2**20  # bytes
+
+# recent media messages per channel, for media commands, see src/types/media.py
+recent_media_per_channel: int = 10
+recent_media_channels: int = 1000
+
+# local evaluation for `math`, see src/util/math_eval.py
+math_processes: int = 1
+math_timeout: float = 1  # seconds, before the evaluating process is killed
+
+# ruff for `format`, see src/types/formatter.py
+ruff_concurrency: int = 2
+ruff_timeout: float = 10  # seconds
+ruff_cache_size: int = 256
+
+# LaTeX rendering for `latex`, see src/types/latex.py
+latex_concurrency: int = 2
+latex_timeout: float = 15  # seconds
+latex_cache_size: int = 32 * 2**20  # bytes
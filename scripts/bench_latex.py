@@ -0,0 +1,73 @@
+"""
+Measure LaTeX render throughput with `LatexRenderer` under concurrent requests.
+
+Usage:
+    python scripts/bench_latex.py [--renders N] [--concurrency N ...] [--unique N]
+
+Each run renders N expressions, of which `--unique` are distinct, all requested at once.
+It is run cold, with an empty cache, for each pool size, and then once more warm.
+Needs latex and dvipng on PATH.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import pathlib
+import statistics
+import sys
+import time
+
+ROOT = pathlib.Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+
+from src.types.latex import LatexRenderer  # noqa: E402
+
+
+def expressions(renders: int, unique: int) -> list[str]:
+    return [f"\\sum_{{n=1}}^{{{i % unique + 2}}} \\frac{{1}}{{n^2}}" for i in range(renders)]
+
+
+async def timed(renderer: LatexRenderer, latex: str) -> float:
+    start = time.perf_counter()
+    await renderer.render(latex)
+    return time.perf_counter() - start
+
+
+async def run(renderer: LatexRenderer, batch: list[str]) -> tuple[float, list[float]]:
+    start = time.perf_counter()
+    latencies = await asyncio.gather(*(timed(renderer, latex) for latex in batch))
+    return time.perf_counter() - start, latencies
+
+
+def report(label: str, elapsed: float, latencies: list[float]) -> None:
+    p95 = statistics.quantiles(latencies, n=20, method="inclusive")[-1] if len(latencies) > 1 else latencies[0]
+    print(
+        f"{label:<16} {len(latencies) / elapsed:>8.1f}/s {elapsed:>8.2f}s "
+        f"{statistics.median(latencies) * 1000:>9.1f}ms {p95 * 1000:>9.1f}ms",
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--renders", type=int, default=32)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--unique", type=int, default=16)
+    args = parser.parse_args()
+
+    batch = expressions(args.renders, args.unique)
+    print(f"{args.renders} renders, {min(args.unique, args.renders)} unique")
+    print(f"{'run':<16} {'throughput':>10} {'total':>9} {'median':>11} {'p95':>11}")
+
+    renderer = None
+    for concurrency in args.concurrency:
+        renderer = LatexRenderer(concurrency=concurrency)
+        report(f"cold, pool={concurrency}", *await run(renderer, batch))
+
+    if renderer is not None:
+        report("warm", *await run(renderer, batch))
+        print(renderer.stats())
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,99 @@
+"""
+Compare the Pillow and Wand paths of `ImageInterface` on typical Discord attachments.
+
+Usage:
+    python scripts/bench_media.py [FILE ...] [--runs N]
+
+Without files, a photo-like JPEG, a screenshot-like PNG and a WebP are generated.
+Each image is rotated 90 degrees and flipped; the time taken and output size are reported.
+"""
+
+from __future__ import annotations
+
+import argparse
+import io
+import pathlib
+import statistics
+import sys
+import time
+from typing import Callable
+
+import numpy as np
+from PIL import Image
+
+ROOT = pathlib.Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+
+from src.types.media import edit_still  # noqa: E402
+
+OPS = [("rotate", {"degree": 90}), ("flip", {})]
+
+
+def samples() -> dict[str, bytes]:
+    rng = np.random.default_rng(0)
+    # smooth gradients with some noise, like a phone photo
+    y, x = np.mgrid[0:1080, 0:1920]
+    photo = np.stack([x / 1920 * 255, y / 1080 * 255, (x + y) / 3000 * 255], axis=-1)
+    photo = (photo + rng.normal(0, 12, photo.shape)).clip(0, 255).astype(np.uint8)
+    # flat blocks of color, like a screenshot
+    screenshot = np.repeat(np.repeat(rng.integers(0, 255, (27, 48, 3), dtype=np.uint8), 40, 0), 40, 1)
+
+    out = {}
+    for name, array, fmt, options in (
+        ("photo.jpg", photo, "JPEG", {"quality": 85}),
+        ("screenshot.png", screenshot, "PNG", {}),
+        ("photo.webp", photo, "WEBP", {"quality": 80}),
+    ):
+        buffer = io.BytesIO()
+        Image.fromarray(array).save(buffer, format=fmt, **options)
+        out[name] = buffer.getvalue()
+    return out
+
+
+def with_pillow(blob: bytes) -> bytes:
+    result = edit_still(blob, OPS)
+    if result is None:
+        msg = "Pillow cannot edit this image"
+        raise ValueError(msg)
+    return result
+
+
+def with_wand(blob: bytes) -> bytes:
+    from wand.image import Image as WandImage
+
+    with WandImage(blob=blob) as image:
+        for name, options in OPS:
+            getattr(image, name)(**options)
+        return image.make_blob("png")
+
+
+def bench(func: Callable[[bytes], bytes], blob: bytes, runs: int) -> tuple[float, int]:
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = func(blob)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times), len(result)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("files", nargs="*", type=pathlib.Path)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    images = {path.name: path.read_bytes() for path in args.files} or samples()
+
+    print(f"{'image':<20} {'input':>10} {'path':<7} {'median':>10} {'output':>10}")
+    for name, blob in images.items():
+        for path, func in (("pillow", with_pillow), ("wand", with_wand)):
+            try:
+                elapsed, size = bench(func, blob, args.runs)
+            except (ImportError, ValueError) as err:
+                print(f"{name:<20} {len(blob):>10} {path:<7} skipped: {err}")
+                continue
+            print(f"{name:<20} {len(blob):>10} {path:<7} {elapsed * 1000:>8.1f}ms {size:>10}")
+
+
+if __name__ == "__main__":
+    main()
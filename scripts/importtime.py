@@ -0,0 +1,96 @@
+"""
+Import-time profile of the bot, built from `python -X importtime`.
+
+Usage:
+    python scripts/importtime.py [module] [--top N] [--save FILE] [--compare FILE]
+
+`--save` writes the cumulative import time of every module as JSON, and
+`--compare` diffs the current run against such a file to catch regressions.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import pathlib
+import re
+import subprocess
+import sys
+
+ROOT = pathlib.Path(__file__).parent.parent
+LINE_REGEX = re.compile(
+    r"import time:\s+(?P<self>\d+)\s+\|\s+(?P<cumulative>\d+)\s+\|(?P<indent>\s+)(?P<name>\S+)",
+)
+
+
+def profile(module: str) -> dict[str, tuple[int, int, int]]:
+    """Get {module: (self us, cumulative us, depth)} for everything `module` imports."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    if proc.returncode != 0:
+        tail = proc.stderr.strip().splitlines()[-1:]
+        msg = f"Importing {module} failed: {''.join(tail)}"
+        raise RuntimeError(msg)
+
+    out: dict[str, tuple[int, int, int]] = {}
+    for line in proc.stderr.splitlines():
+        if match := LINE_REGEX.match(line):
+            depth = (len(match["indent"]) - 1) // 2
+            out[match["name"]] = (
+                int(match["self"]),
+                int(match["cumulative"]),
+                depth,
+            )
+    return out
+
+
+def report(data: dict[str, tuple[int, int, int]], top: int) -> None:
+    total = sum(s for s, _, _ in data.values())
+    print(f"{len(data)} modules imported in {total / 1000:.1f}ms")
+    print(f"{'cumulative':>12} {'self':>10}  module")
+    ranked = sorted(data.items(), key=lambda t: t[1][1], reverse=True)
+    for name, (self_us, cumulative_us, depth) in ranked[:top]:
+        print(f"{cumulative_us / 1000:>10.1f}ms {self_us / 1000:>8.1f}ms  {'  ' * depth}{name}")
+
+
+def compare(data: dict[str, tuple[int, int, int]], baseline: dict[str, int], top: int) -> None:
+    current = {name: cumulative for name, (_, cumulative, _) in data.items()}
+    added = set(current) - set(baseline)
+    deltas = sorted(
+        ((name, current[name] - baseline.get(name, 0)) for name in current),
+        key=lambda t: t[1],
+        reverse=True,
+    )
+    print(f"\n{len(added)} new modules, {len(set(baseline) - set(current))} no longer imported")
+    print(f"{'delta':>12}  module")
+    for name, delta in deltas[:top]:
+        print(f"{delta / 1000:>+10.1f}ms  {name}{' [new]' if name in added else ''}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("module", nargs="?", default="main")
+    parser.add_argument("--top", type=int, default=25)
+    parser.add_argument("--save", type=pathlib.Path)
+    parser.add_argument("--compare", type=pathlib.Path)
+    args = parser.parse_args()
+
+    data = profile(args.module)
+    report(data, args.top)
+
+    if args.compare is not None:
+        compare(data, json.loads(args.compare.read_text()), args.top)
+
+    if args.save is not None:
+        args.save.write_text(
+            json.dumps({name: c for name, (_, c, _) in data.items()}, indent=2),
+        )
+
+
+if __name__ == "__main__":
+    main()
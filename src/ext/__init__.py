@@ -1,13 +1,26 @@
-import os
+import pathlib
 
-from src.logging import book
+EXT_ROOT = pathlib.Path(__file__).parent
 
-MODULE_PATHS = [
-    os.path.join(dirpath, f).replace(os.sep, ".").strip(".")[:-3]  # noqa: PTH118
-    for (dirpath, _, filenames) in os.walk(
-        f".{os.sep}src{os.sep}ext",
-        onerror=lambda oserror: book.critical(oserror),
+# extension: extensions which must be loaded before it
+EXTENSION_DEPENDENCIES: dict[str, tuple[str, ...]] = {
+    "src.ext.development.errors": ("src.ext.help",),
+}
+
+# heavy extensions which are loaded in the background once the bot is connecting
+DEFERRED_EXTENSIONS: set[str] = {
+    "src.ext.cello",
+    "src.ext.code",
+    "src.ext.media",
+    "src.ext.preview",
+}
+
+
+def discover_extensions() -> list[str]:
+    """Find every extension module in this package, skipping private (`_`-prefixed) modules."""
+    src_root = EXT_ROOT.parent.parent
+    return sorted(
+        ".".join(path.relative_to(src_root).with_suffix("").parts)
+        for path in EXT_ROOT.rglob("*.py")
+        if not path.name.startswith("_")
     )
-    for f in filenames
-    if f.endswith(".py") and not f.startswith("_")
-]
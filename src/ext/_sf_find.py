@@ -11,12 +11,110 @@
 #     discord.Guild
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
+import asyncio
+import time
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Hashable
 
 import discord
 
+from src.util.cache import coalesce
+
 if TYPE_CHECKING:
-    from src.types.core import VanirContext
+    from src.types.core import SFType, VanirContext
+
+
+class SnowflakeResolver:
+    def __init__(
+        self,
+        *,
+        list_ttl: float = 30,
+        negative_ttl: float = 300,
+        max_absent: int = 10_000,
+    ) -> None:
+        """
+        Shares API calls between snowflake lookups.
+
+        Args:
+        ----
+            list_ttl (float): How long full role/channel listings of a guild are kept, in seconds.
+            negative_ttl (float): How long an ID that could not be fetched is remembered, in seconds.
+            max_absent (int): The maximum number of absent IDs to remember.
+
+        """
+        self.list_ttl = list_ttl
+        self.negative_ttl = negative_ttl
+        self.max_absent = max_absent
+
+        # key: expiry
+        self.absent: dict[Hashable, float] = {}
+        # (kind, guild id): (expiry, {object id: object})
+        self.listings: dict[tuple[str, int], tuple[float, dict[int, Any]]] = {}
+        # key: the fetch every concurrent lookup of that key waits on
+        self.inflight: dict[Hashable, asyncio.Future] = {}
+
+    def is_absent(self, key: Hashable) -> bool:
+        expiry = self.absent.get(key)
+        if expiry is None:
+            return False
+        if expiry < time.monotonic():
+            del self.absent[key]
+            return False
+        return True
+
+    def mark_absent(self, key: Hashable) -> None:
+        if len(self.absent) >= self.max_absent:
+            # dicts keep insertion order, so this drops the oldest entry
+            del self.absent[next(iter(self.absent))]
+        self.absent[key] = time.monotonic() + self.negative_ttl
+
+    async def fetch(
+        self,
+        key: Hashable,
+        fetch: Callable[[], Awaitable[Any]],
+    ) -> Any | None:
+        """Fetch a single object, remembering IDs which do not exist."""
+        if self.is_absent(key):
+            return None
+
+        async def inner() -> Any | None:
+            try:
+                return await fetch()
+            except discord.NotFound:
+                self.mark_absent(key)
+                return None
+
+        return await coalesce(self.inflight, key, inner)
+
+    async def from_listing(
+        self,
+        kind: str,
+        guild_id: int,
+        object_id: int,
+        fetch_all: Callable[[], Awaitable[list[Any]]],
+    ) -> Any | None:
+        """Find an object in a guild-wide listing, which is fetched at most once per `list_ttl`."""
+        # IDs missing from a listing are not marked absent, the listing itself
+        # answers for them until it expires, so new objects show up within `list_ttl`
+        listing_key = (kind, guild_id)
+        cached = self.listings.get(listing_key)
+        if cached is None or cached[0] < time.monotonic():
+
+            async def inner() -> dict[int, Any]:
+                listing = {obj.id: obj for obj in await fetch_all()}
+                self.listings[listing_key] = (
+                    time.monotonic() + self.list_ttl,
+                    listing,
+                )
+                return listing
+
+            listing = await coalesce(self.inflight, listing_key, inner)
+        else:
+            listing = cached[1]
+
+        return listing.get(object_id)
+
+
+resolver = SnowflakeResolver()
 
 
 # MEMBER / USER
@@ -25,22 +123,23 @@ async def find_member(
     member_id: int,
     *,
     make_request: bool,
-) -> discord.Member | None:
+) -> discord.Member | discord.User | None:
     if member := ctx.guild.get_member(member_id):
         return member
     if member := ctx.bot.get_user(member_id):
         return member
 
     if make_request:
-        try:
-            return await ctx.guild.fetch_member(member_id)
-        except discord.NotFound:
-            pass
+        if member := await resolver.fetch(
+            ("member", ctx.guild.id, member_id),
+            lambda: ctx.guild.fetch_member(member_id),
+        ):
+            return member
 
-        try:
-            return await ctx.bot.fetch_user(member_id)
-        except discord.NotFound:
-            pass
+        return await resolver.fetch(
+            ("user", member_id),
+            lambda: ctx.bot.fetch_user(member_id),
+        )
 
     return None
 
@@ -56,8 +155,12 @@ async def find_role(
         return role
 
     if make_request:
-        if role := discord.utils.get(await ctx.guild.fetch_roles(), id=role_id):
-            return role
+        return await resolver.from_listing(
+            "role",
+            ctx.guild.id,
+            role_id,
+            ctx.guild.fetch_roles,
+        )
 
     return None
 
@@ -73,11 +176,12 @@ async def find_channel(
         return channel
 
     if make_request:
-        if channel := discord.utils.get(
-            await ctx.guild.fetch_channels(),
-            id=channel_id,
-        ):
-            return channel
+        return await resolver.from_listing(
+            "channel",
+            ctx.guild.id,
+            channel_id,
+            ctx.guild.fetch_channels,
+        )
 
     return None
 
@@ -93,10 +197,10 @@ async def find_emoji(
         return emoji
 
     if make_request:
-        try:
-            return await ctx.guild.fetch_emoji(emoji_id)
-        except discord.NotFound:
-            pass
+        return await resolver.fetch(
+            ("emoji", ctx.guild.id, emoji_id),
+            lambda: ctx.guild.fetch_emoji(emoji_id),
+        )
 
     return None
 
@@ -112,10 +216,10 @@ async def find_message(
         return message
 
     if make_request:
-        try:
-            return await ctx.channel.fetch_message(message_id)
-        except discord.NotFound:
-            pass
+        return await resolver.fetch(
+            ("message", ctx.channel.id, message_id),
+            lambda: ctx.channel.fetch_message(message_id),
+        )
 
     return None
 
@@ -131,9 +235,58 @@ async def find_guild(
         return guild
 
     if make_request:
-        try:
-            return await ctx.bot.fetch_guild(guild_id)
-        except discord.NotFound:
-            pass
+        return await resolver.fetch(
+            ("guild", guild_id),
+            lambda: ctx.bot.fetch_guild(guild_id),
+        )
+
+    return None
+
+
+# in order of priority - if two objects share an ID, the first finder wins
+FINDERS = (
+    find_member,
+    find_role,
+    find_channel,
+    find_emoji,
+    find_message,
+    find_guild,
+)
+
+
+# ANY
+def _retrieve_exception(task: asyncio.Task) -> None:
+    if not task.cancelled():
+        task.exception()
+
+
+async def find_any(
+    ctx: VanirContext,
+    object_id: int,
+    *,
+    make_request: bool,
+) -> SFType | None:
+    # every cache first, so that an object the bot already has never costs an API call
+    for finder in FINDERS:
+        if (result := await finder(ctx, object_id, make_request=False)) is not None:
+            return result
+
+    if not make_request:
+        return None
+
+    tasks = [
+        asyncio.create_task(finder(ctx, object_id, make_request=True))
+        for finder in FINDERS
+    ]
+    try:
+        # every finder runs concurrently, but results are still taken in priority order
+        for task in tasks:
+            if (result := await task) is not None:
+                return result
+    finally:
+        for task in tasks:
+            task.cancel()
+            # abandoned tasks may still fail, which should not be logged as never retrieved
+            task.add_done_callback(_retrieve_exception)
 
     return None
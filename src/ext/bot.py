@@ -11,21 +11,24 @@ import time
 from asyncio import subprocess
 from typing import TYPE_CHECKING
 
-import cpuinfo
 import discord
-import GPUtil
-import psutil
 from discord.ext import commands
 
 from src.constants import ANSI, EMOJIS, GITHUB_ROOT
 from src.types.command import GitHubView, VanirCog, vanir_command
+from src.types.resilience import guard_stats
 from src.types.util import timed
 from src.util.cache import timed_lru_cache
-from src.util.format import format_children, format_size, natural_join
+from src.util.format import format_children, format_dict, format_size, natural_join
+from src.util.lazy import lazy_import
 
 if TYPE_CHECKING:
     from src.types.core import Vanir, VanirContext
 
+cpuinfo = lazy_import("cpuinfo")
+GPUtil = lazy_import("GPUtil")
+psutil = lazy_import("psutil")
+
 
 class Bot(VanirCog):
     """Commands that deal with the bot itself."""
@@ -38,7 +41,8 @@ class Bot(VanirCog):
         delays = {
             "\N{SHINTO SHRINE} Discord Gateway": self.bot.latency,
             "\N{EARTH GLOBE AMERICAS} Web Requests": await timed(
-                self.bot.session.get,
+                self.bot.session.fetch,
+                "GET",
                 "https://example.com",
             ),
             "\N{ELEPHANT} PGSQL DB": await timed(
@@ -50,6 +54,36 @@ class Bot(VanirCog):
         for name, delay in delays.items():
             embed.add_field(name=name, value=f"`{delay*1000:.3f}ms`", inline=False)
 
+        embed.add_field(
+            name="\N{EARTH GLOBE AMERICAS} HTTP Connections",
+            value=format_dict(
+                {k: f"`{v}`" for k, v in self.bot.session.connection_stats().items()},
+            ),
+            inline=False,
+        )
+
+        embed.add_field(
+            name="\N{CARD FILE BOX} HTTP Cache",
+            value=format_dict(
+                {k: f"`{v}`" for k, v in self.bot.session.cache.stats().items()},
+            ),
+            inline=False,
+        )
+
+        embed.add_field(
+            name="\N{ELECTRIC PLUG} Services",
+            value=format_dict({k: f"`{v}`" for k, v in guard_stats().items()}),
+            inline=False,
+        )
+
+        if self.bot.pool is not None:
+            stats = self.bot.pool.stats()
+            embed.add_field(
+                name="\N{ELEPHANT} PGSQL Pool",
+                value=format_dict({k: f"`{v}`" for k, v in stats.items()}),
+                inline=False,
+            )
+
         await ctx.reply(embed=embed)
 
     @vanir_command(aliases=["src"])
@@ -6,9 +6,12 @@ from typing import cast
 from src.types.core import Vanir, VanirContext
 from src.types.command import VanirCog, vanir_command, VanirView, AcceptItx
 from src.types.cello import VanirPlayer
+from src.types.resilience import guard
 from src.util.command import cog_hidden
 from src.logging import book
 
+lavalink = guard("lavalink")
+
 
 class Cello(VanirCog):
     """getcho jams on"""
@@ -126,10 +129,19 @@ async def ensure_player(ctx: VanirContext) -> VanirPlayer:
     return player
 
 
+async def search_tracks(query: str | None, **kwargs) -> wavelink.Search:
+    return await lavalink.call(
+        lambda: wavelink.Playable.search(query, **kwargs),
+        # searches only read, so are safe to retry
+        idempotent=True,
+        errors=(wavelink.NodeException, wavelink.InvalidNodeException, TimeoutError),
+    )
+
+
 async def evaluate_query(query: str | None) -> wavelink.Playable | None:
-    tracks = await wavelink.Playable.search(query, source="ytmsearch:")
+    tracks = await search_tracks(query, source="ytmsearch:")
     if not tracks:
-        tracks = await wavelink.Playable.search(query)
+        tracks = await search_tracks(query)
         return tracks[0] if tracks else None
 
     if isinstance(track := tracks, wavelink.Playlist):
@@ -11,9 +11,18 @@ from discord.ext import commands
 
 from src.constants import EMOJIS
 from src.types.command import CloseButton, VanirCog, VanirView, vanir_command
-from src.types.piston import PistonExecutable, PistonPackage, PistonRuntime
+from src.types.formatter import formatter
+from src.types.piston import (
+    PistonExecutable,
+    PistonPackage,
+    PistonRuntime,
+    execution_key,
+    piston_catalog,
+    piston_scheduler,
+)
 from src.util.format import trim_codeblock
-from src.util.parse import fuzzysearch, language_from_codeblock, unique
+from src.util.math_eval import is_deterministic, math_worker
+from src.util.parse import language_from_codeblock
 from src.util.ux import generate_modal
 
 if TYPE_CHECKING:
@@ -44,6 +53,26 @@ class Code(VanirCog):
         ),
     ) -> None:
         """Execute code."""
+        await self.run_code(ctx, language, version, code)
+
+    async def run_code(
+        self,
+        ctx: VanirContext,
+        language: str | None,
+        version: str | None,
+        code: str | None,
+        *,
+        cacheable: bool = False,
+    ) -> None:
+        """
+        Execute `code` and reply with its output, asking for the code if it is None.
+
+        Args:
+        ----
+            cacheable (bool): Whether the code is deterministic, so that the result of running it
+                              again with the same runtime may be reused.
+
+        """
         if code is None:
             if ctx.interaction is not None:
                 code, *_ = await generate_modal(
@@ -75,12 +104,12 @@ class Code(VanirCog):
                     raise commands.CommandError(msg) from err
 
         if language is None:  # only happens in itx
-            language = language_from_codeblock(self.bot, code)
+            language = language_from_codeblock(code)
             if language is None:
                 msg = "No language specified"
                 raise ValueError(msg)
         elif language.startswith("```"):
-            language = language_from_codeblock(self.bot, language)
+            language = language_from_codeblock(language)
             if language is None:
                 msg = "No language specified"
                 raise ValueError(msg)
@@ -89,34 +118,15 @@ class Code(VanirCog):
             version = None
 
         else:
-            for p in self.bot.installed_piston_packages:
-                if p.language == language or language in p.aliases:
-                    language = p.language
-                    break
-            else:
+            language = piston_catalog.language(language)
+            if language is None:
                 msg = "Invalid language - please use the autocomplete menu to select a valid language."
                 raise ValueError(msg)
 
-        if version in (None, "latest"):
-            version = max(
-                (
-                    rt.version
-                    for rt in self.bot.installed_piston_packages
-                    if rt.language == language
-                ),
-                key=lambda v: tuple(int(x) for x in v.split(".")),
-            )
-        else:
-            version = version.strip("v`").lower()
-            real_ver = discord.utils.find(
-                lambda rt: rt.language == language
-                and (rt.version == version or version in rt.aliases),
-                self.bot.installed_piston_packages,
-            )
-            if real_ver is None:
-                msg = f"Invalid version: {version}"
-                raise ValueError(msg)
-            version = real_ver.version
+        runtime = piston_catalog.runtime(language, version)
+        if runtime is None:
+            msg = f"Invalid version: {version}"
+            raise ValueError(msg)
 
         code = code.replace("```", "\n```\n").strip("\n")
 
@@ -125,35 +135,42 @@ class Code(VanirCog):
 
         code = trim_codeblock(code).strip("\n `")
 
-        runtime = discord.utils.get(
-            self.bot.installed_piston_packages,
-            language=language,
-            version=version,
-        )
-        if runtime is None:
-            msg = "No runtime found for language and version"
-            raise RuntimeError(msg)
-
-        start_time = time.perf_counter()
-        response = await self.bot.piston.execute(
-            package=PistonPackage(
-                language=runtime.language,
-                language_version=runtime.version,
+        package = PistonPackage(language=runtime.language, language_version=runtime.version)
+        executables = [
+            PistonExecutable(
+                name="main",
+                content=code,
             ),
-            files=[
-                PistonExecutable(
-                    name="main",
-                    content=code,
-                ),
-            ],
+        ]
+        job = piston_scheduler.submit(
+            lambda: self.bot.piston.execute(package=package, files=executables),
+            user_id=ctx.author.id,
+            cache_key=execution_key(package, executables) if cacheable else None,
         )
-        exec_diff = time.perf_counter() - start_time
+
+        status = None
+        if (position := piston_scheduler.position(job)) is not None:
+            status = await ctx.reply(f"`Queued, {position} executions ahead...`")
+        try:
+            response = await piston_scheduler.wait_for(job)
+        except Exception:
+            if status is not None:
+                await status.delete()
+            raise
+        exec_diff = job.run_time
 
         result = response.run
         embeds = []
         files = []
         out = result.stdout or "<<No output>>"
 
+        if job.cached:
+            timing = "cached result"
+        else:
+            timing = f"executed & compiled in `{exec_diff*1000:.2f}ms`"
+            if status is not None:
+                timing += f" after queueing for `{job.wait_time*1000:.2f}ms`"
+
         input_embed = ctx.embed(
             title="Input",
             description=f"```{runtime.language}\n{code}```",
@@ -175,7 +192,7 @@ class Code(VanirCog):
             embeds.append(
                 ctx.embed(
                     title="stdout",
-                    description=f"executed & compiled in `{exec_diff*1000:.2f}ms`\n```\n{out}```",
+                    description=f"{timing}\n```\n{out}```",
                 ),
             )
 
@@ -188,7 +205,10 @@ class Code(VanirCog):
                 ),
             )
         view = AfterCodeExecView(ctx, runtime, code)
-        await ctx.reply(embeds=embeds, files=files, view=view)
+        if status is not None:
+            await status.edit(content=None, embeds=embeds, attachments=files, view=view)
+        else:
+            await ctx.reply(embeds=embeds, files=files, view=view)
 
     @exec.autocomplete("language")
     async def _autocomplete_language(
@@ -196,28 +216,7 @@ class Code(VanirCog):
         itx: discord.Interaction,
         argument: str,
     ) -> list[discord.app_commands.Choice]:
-        return (
-            fuzzysearch(
-                argument,
-                self.bot.installed_piston_packages,
-                output=lambda rt: discord.app_commands.Choice(
-                    name=rt.language,
-                    value=rt.language,
-                ),
-                threshold=70,
-            )[:25]
-            if argument
-            else [
-                discord.app_commands.Choice(
-                    name=rt.language,
-                    value=rt.language,
-                )
-                for rt in unique(
-                    self.bot.installed_piston_packages,
-                    key=lambda rt: rt.language,
-                )
-            ][:25]
-        )
+        return self.bot.cache.piston_language_index.search(argument)
 
     @exec.autocomplete("version")
     async def _autocomplete_version(
@@ -226,21 +225,13 @@ class Code(VanirCog):
         argument: str,
     ) -> list[discord.app_commands.Choice]:
         language = itx.namespace.__dict__.get("language")
-        if language is None or language not in [
-            p.language for p in self.bot.installed_piston_packages
-        ]:
+        versions = self.bot.cache.piston_versions.get(language)
+        if versions is None:
             return [
                 discord.app_commands.Choice(name="No valid package selected", value=""),
             ]
 
-        return [
-            discord.app_commands.Choice(
-                name=rt.version,
-                value=rt.version,
-            )
-            for rt in self.bot.installed_piston_packages
-            if rt.language == language
-        ][:25]
+        return versions
 
     def fmtpack(self, rt: PistonRuntime) -> str:
         return f"{rt.language} {rt.version}"
@@ -256,7 +247,7 @@ class Code(VanirCog):
         ),
     ) -> None:
         """Execute python code."""
-        await self.exec(ctx, package="python", code=code)
+        await self.run_code(ctx, "python", None, code)
 
     @vanir_command()
     async def math(
@@ -268,17 +259,65 @@ class Code(VanirCog):
             default=None,
         ),
     ) -> None:
-        """Math via python."""
+        """Math via python, evaluated locally where possible."""
         lines = trim_codeblock(code).splitlines()
         last = lines[-1]
         if last.count("(") == last.count(")") and "print" not in last:
             last = f"print({last})"
         code = "\n".join(lines[:-1] + [last])
+
+        start_time = time.perf_counter()
+        try:
+            out = await math_worker.evaluate(code)
+        except Exception:  # noqa: BLE001
+            # run anything the evaluator rejects or fails on for real, for Python's own output
+            pass
+        else:
+            exec_diff = time.perf_counter() - start_time
+            await self.reply_math(ctx, code, out, exec_diff)
+            return
+
+        # only what the evaluator rejected gets here, so check whether a cached result would be right
+        cacheable = is_deterministic(code)
         code = f"""
 from math import *
 {code}
 """
-        await self.exec(ctx, package="python", code=code)
+        await self.run_code(ctx, "python", None, code, cacheable=cacheable)
+
+    async def reply_math(
+        self,
+        ctx: VanirContext,
+        code: str,
+        out: str,
+        exec_diff: float,
+    ) -> None:
+        input_embed = ctx.embed(
+            title="Input",
+            description=f"```python\n{code}```",
+        )
+        input_embed.set_footer(text="evaluated locally")
+        embeds = [input_embed]
+        files = []
+
+        out = out or "<<No output>>"
+        if len(out) > 2000:
+            files.append(
+                discord.File(
+                    io.BytesIO(out.encode()),
+                    filename="output.txt",
+                ),
+            )
+        else:
+            embeds.append(
+                ctx.embed(
+                    title="stdout",
+                    description=f"evaluated in `{exec_diff*1000:.2f}ms`\n```\n{out}```",
+                ),
+            )
+
+        view = AfterCodeExecView(ctx, None, code)
+        await ctx.reply(embeds=embeds, files=files, view=view)
 
     @vanir_command(aliases=["fmt", "ruff"])
     async def format(
@@ -332,21 +371,13 @@ from math import *
 
         python_code = trim_codeblock(python_code)
         start_time = time.perf_counter()
-        command = "py -m ruff format -"
-
-        shell = await asyncio.create_subprocess_shell(
-            command,
-            stdin=asyncio.subprocess.PIPE,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE,
-        )
-        stdout, stderr = await shell.communicate(python_code.encode())
+        result = await formatter.format(python_code)
         exec_diff = time.perf_counter() - start_time
 
-        out = stdout.decode()
+        out = result.output
         if diff:
             out = self.diff_formatter(python_code, out)
-        err = stderr.decode()
+        err = result.error
 
         if len(out) > 4000:
             files = [
@@ -411,7 +442,7 @@ class AfterCodeExecView(VanirView):
     def __init__(
         self,
         ctx: VanirContext,
-        runtime: PistonRuntime,
+        runtime: PistonRuntime | None,
         code: str,
     ) -> None:
         super().__init__(bot=ctx.bot, user=ctx.author)
@@ -8,18 +8,30 @@ import time
 from typing import TYPE_CHECKING, NoReturn
 
 import aiohttp
-import dataframe_image as dfi
 import discord
-import pandas as pd
 from discord.ext import commands
 
 from src.types.command import VanirCog
-from src.types.piston import PistonPackage
+from src.types.ffmpeg import scheduler
+from src.types.formatter import formatter
+from src.types.latex import renderer
+from src.types.media import recent_media
+from src.types.media_cache import result_cache
+from src.types.piston import (
+    PistonPackage,
+    parse_version,
+    piston_catalog,
+    piston_scheduler,
+)
 from src.util.command import cog_hidden
+from src.util.lazy import lazy_import
 
 if TYPE_CHECKING:
     from src.types.core import Vanir, VanirContext
 
+dfi = lazy_import("dataframe_image")
+pd = lazy_import("pandas")
+
 
 @cog_hidden
 class Dev(VanirCog):
@@ -120,16 +132,11 @@ class Dev(VanirCog):
         to_install_ver: str | None = None,
     ) -> None:
         if to_install is None:
-            installed = sorted(
-                await self.bot.piston.runtimes(),
-                key=lambda x: (x.language, tuple(int(v) for v in x.version.split("."))),
-            )
+            await piston_catalog.refresh()
+            installed = piston_catalog.runtimes
             reg = sorted(
                 await self.bot.piston.packages(),
-                key=lambda x: (
-                    x.language,
-                    tuple(int(v) for v in x.language_version.split(".")),
-                ),
+                key=lambda x: (x.language, parse_version(x.language_version)),
             )
             embeds = [
                 ctx.embed(
@@ -167,9 +174,7 @@ class Dev(VanirCog):
                 vers = [
                     max(
                         relevant,
-                        key=lambda x: tuple(
-                            int(v) for v in x.language_version.split(".")
-                        ),
+                        key=lambda x: parse_version(x.language_version),
                     ).language_version,
                 ]
             elif to_install_ver in (pkg.language_version for pkg in relevant):
@@ -199,8 +204,88 @@ class Dev(VanirCog):
                     )
                 finally:
                     await asyncio.sleep(1)
+
+            try:
+                await piston_catalog.refresh()
+            except Exception as err:  # noqa: BLE001
+                await ctx.send(f"`Could not refresh runtimes: {err}`")
+
             return None
 
+    @dev.command()
+    async def pool(self, ctx: VanirContext) -> None:
+        """Show database pool statistics."""
+        if self.bot.pool is None:
+            await ctx.reply("`Not connected to the database`")
+            return
+
+        embed = ctx.embed("Database Pool")
+        for name, value in self.bot.pool.stats().items():
+            embed.add_field(name=name, value=f"`{value}`", inline=False)
+        await ctx.reply(embed=embed)
+
+    @dev.command(aliases=["ffmpeg"])
+    async def media(self, ctx: VanirContext) -> None:
+        """Show ffmpeg job queue, media cache and recent media statistics."""
+        embed = ctx.embed("Media")
+        for name, value in scheduler.stats().items():
+            embed.add_field(name=f"FFmpeg {name}", value=f"`{value}`", inline=False)
+        for name, value in result_cache.stats().items():
+            embed.add_field(name=f"Cache {name}", value=f"`{value}`", inline=False)
+        for name, value in recent_media.stats().items():
+            embed.add_field(name=f"Recent {name}", value=f"`{value}`", inline=False)
+        await ctx.reply(embed=embed)
+
+    @dev.command(aliases=["exec"])
+    async def executions(self, ctx: VanirContext) -> None:
+        """Show Piston execution queue statistics."""
+        embed = ctx.embed("Executions")
+        for name, value in piston_scheduler.stats().items():
+            embed.add_field(name=name, value=f"`{value}`", inline=False)
+        await ctx.reply(embed=embed)
+
+    @dev.command()
+    async def ruff(self, ctx: VanirContext) -> None:
+        """Show ruff formatter statistics."""
+        embed = ctx.embed("Formatter")
+        for name, value in formatter.stats().items():
+            embed.add_field(name=name, value=f"`{value}`", inline=False)
+        await ctx.reply(embed=embed)
+
+    @dev.command()
+    async def latex(self, ctx: VanirContext) -> None:
+        """Show LaTeX render statistics."""
+        embed = ctx.embed("LaTeX")
+        for name, value in renderer.stats().items():
+            embed.add_field(name=name, value=f"`{value}`", inline=False)
+        await ctx.reply(embed=embed)
+
+    @dev.command()
+    async def startup(self, ctx: VanirContext) -> None:
+        """Show where startup time went."""
+        embed = ctx.embed(
+            "Startup Timeline",
+            description=f"```\n{self.bot.startup.report()}\n```",
+        )
+        await ctx.reply(embed=embed)
+
+    @dev.command(aliases=["exts"])
+    async def extensions(self, ctx: VanirContext) -> None:
+        """Show how long each extension took to load."""
+        loader = self.bot.extension_loader
+        if loader is None:
+            await ctx.reply("`Extensions were not loaded through the loader`")
+            return
+
+        loads = sorted(loader.loads.values(), key=lambda x: x.elapsed or 0, reverse=True)
+        embed = ctx.embed(
+            "Extensions",
+            description="\n".join(
+                f"`{load}`{' [deferred]' if load.deferred else ''}" for load in loads
+            ),
+        )
+        await ctx.reply(embed=embed)
+
     @dev.command()
     async def fmt(self, ctx: VanirContext) -> None:
         # run ./fmt.bat
@@ -9,6 +9,7 @@ from src.constants import LANGUAGE_CODE_MAP
 from src.logging import book
 from src.types.command import VanirCog
 from src.types.core import TranslatedMessage, Vanir, VanirContext
+from src.types.media import recent_media
 from src.types.snipe import SnipedMessage, SnipeType
 from src.util.command import cog_hidden
 
@@ -27,6 +28,7 @@ class CelloEvents(VanirCog):
 
     @commands.Cog.listener()
     async def on_message(self, message: discord.Message) -> None:
+        recent_media.add(message)
         await self.handle_tlink(message)
 
     @commands.Cog.listener()
@@ -35,12 +37,29 @@ class CelloEvents(VanirCog):
         before: discord.Message,
         after: discord.Message,
     ) -> None:
+        recent_media.add(after)
         await self.handle_snipe(before, after)
 
     @commands.Cog.listener()
     async def on_message_delete(self, message: discord.Message) -> None:
         await self.handle_snipe(message)
 
+    @commands.Cog.listener()
+    async def on_raw_message_delete(
+        self,
+        payload: discord.RawMessageDeleteEvent,
+    ) -> None:
+        # raw, so that messages which fell out of the message cache are forgotten too
+        recent_media.forget(payload.channel_id, payload.message_id)
+
+    @commands.Cog.listener()
+    async def on_raw_bulk_message_delete(
+        self,
+        payload: discord.RawBulkMessageDeleteEvent,
+    ) -> None:
+        for message_id in payload.message_ids:
+            recent_media.forget(payload.channel_id, message_id)
+
     @commands.Cog.listener()
     async def on_raw_reaction_add(
         self,
@@ -121,9 +140,9 @@ class CelloEvents(VanirCog):
             if from_lang_code != "__":
                 json["source_lang"] = from_lang_code
 
-            response = await self.bot.session.deepl("/translate", json=json)
-            response.raise_for_status()
-            tsl = (await response.json())["translations"][0]
+            tsl = (await self.bot.session.deepl("/translate", json=json))[
+                "translations"
+            ][0]
 
             # "detected_source_language" will be what it detected, or what was given, if AUTO
             source = LANGUAGE_CODE_MAP[tsl["detected_source_language"]]
@@ -20,7 +20,6 @@ from src.util.command import (
     cog_hidden
 )
 from src.util.format import format_dict
-from src.util.parse import fuzzysearch
 
 
 @cog_hidden
@@ -223,26 +222,9 @@ class Help(VanirCog):
 
     @help.autocomplete("thing")
     async def _thing_autocomplete(self, ctx: VanirContext, thing: str):
-        all_values: list[tuple[str, str]] = []
-        all_values.extend(
-            ("Module", cog.qualified_name) for cog in get_display_cogs(self.bot)
-        )
-        for cmd in self.bot.walk_commands():
-            if not cmd.hidden and not cmd.qualified_name.startswith("jishaku"):
-                all_values.append(
-                    (
-                        "Command" if not isinstance(cmd, commands.Group) else "Group",
-                        cmd.qualified_name,
-                    ),
-                )
-
-        all_values = fuzzysearch(thing.lower(), all_values, key=lambda t: t[1].lower())[
-            :25
-        ]
-
         return [
             discord.app_commands.Choice(name=f"[{typ}] {ident}", value=ident)
-            for typ, ident in all_values
+            for typ, ident in self.bot.cache.command_index.search(thing)
         ]
 
 
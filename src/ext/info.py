@@ -1,15 +1,14 @@
 from __future__ import annotations
 
+import asyncio
+import functools
 import re
 import time
 import unicodedata
 from typing import TYPE_CHECKING, Awaitable
 
 import discord
-import pint
-import texttable
 from discord.ext import commands
-from pint import UnitRegistry
 
 from src.constants import (
     ALL_PERMISSIONS,
@@ -21,19 +20,14 @@ from src.constants import (
     VALID_IMAGE_FORMATS,
     VOICE_CHANNEL_PERMISSIONS,
 )
-from src.ext._sf_find import (
-    find_channel,
-    find_emoji,
-    find_guild,
-    find_member,
-    find_message,
-    find_role,
-)
+from src.ext._sf_find import find_any
 from src.types.command import AcceptItx, VanirCog, VanirView, vanir_command
 from src.types.core import SFType, VanirContext
 from src.types.interface import EmojiConverter
+from src.util.autocomplete import AutocompleteIndex
 from src.util.format import ctext, format_bool, format_children, format_dict
-from src.util.parse import closest_color_name, find_ext, find_filename, fuzzysearch
+from src.util.lazy import lazy_import
+from src.util.parse import closest_color_name, find_ext, find_filename
 from src.util.regex import (
     CONNECTOR_REGEX,
     DISCORD_TIMESTAMP_REGEX,
@@ -50,19 +44,32 @@ from src.util.time import ShortTime, format_time
 if TYPE_CHECKING:
     from src.types.core import Vanir
 
-ureg = UnitRegistry()
-units = [
-    unit
-    for unitname in dir(ureg)
-    if isinstance((unit := getattr(ureg, unitname)), pint.Unit)
-]
-unit_choices = [
-    discord.app_commands.Choice(
-        name=f"{unit} [{unit.dimensionality.format_babel('P')}]",
-        value=str(unit),
+pint = lazy_import("pint")
+texttable = lazy_import("texttable")
+
+# filled on first use, building the registry takes a while
+unit_index = AutocompleteIndex[discord.app_commands.Choice](key=lambda x: x.name)
+
+
+@functools.cache
+def unit_registry() -> pint.UnitRegistry:
+    return pint.UnitRegistry()
+
+
+def build_unit_index() -> None:
+    ureg = unit_registry()
+    units = [
+        unit
+        for unitname in dir(ureg)
+        if isinstance((unit := getattr(ureg, unitname)), pint.Unit)
+    ]
+    unit_index.rebuild(
+        discord.app_commands.Choice(
+            name=f"{unit} [{unit.dimensionality.format_babel('P')}]",
+            value=str(unit),
+        )
+        for unit in units
     )
-    for unit in units
-]
 
 
 class Info(VanirCog):
@@ -91,19 +98,10 @@ class Info(VanirCog):
         sf = int(snowflake)
 
         if search:
-            methods = [
-                find_member,
-                find_role,
-                find_channel,
-                find_emoji,
-                find_message,
-                find_guild,
-            ]
-            for finder in methods:
-                result = await finder(ctx, sf, make_request=True)
-                if result is not None:
-                    await self.bot.dispatch_sf(ctx, result)
-                    return
+            result = await find_any(ctx, sf, make_request=True)
+            if result is not None:
+                await self.bot.dispatch_sf(ctx, result)
+                return
 
         else:
             self.snowflake.reset_cooldown(ctx)
@@ -215,6 +213,7 @@ class Info(VanirCog):
         ),
     ) -> None:
         """Convert a quantity between compatible units."""
+        ureg = await asyncio.to_thread(unit_registry)
         from_qty, from_unit = UNIT_SEPARATOR_REGEX.sub(
             UNIT_SEPARATOR_SUB_REGEX,
             from_,
@@ -257,11 +256,9 @@ class Info(VanirCog):
         itx: discord.Interaction,
         argument: str,
     ) -> list[discord.app_commands.Choice]:
-        return fuzzysearch(
-            argument,
-            unit_choices,
-            key=lambda x: x.name,
-        )[:25]
+        if not unit_index:
+            await asyncio.to_thread(build_unit_index)
+        return unit_index.search(argument)
 
     @vanir_command(
         aliases=["user", "member", "who", "whois", "ui"],
@@ -3,7 +3,6 @@ from __future__ import annotations
 from typing import TYPE_CHECKING
 
 import discord
-import nltk
 from discord import app_commands
 from discord.ext import commands
 
@@ -17,10 +16,13 @@ from src.constants import (
 )
 from src.types.command import VanirCog, VanirView, vanir_command
 from src.util.command import langcode_autocomplete
+from src.util.lazy import lazy_import
 
 if TYPE_CHECKING:
     from src.types.core import Vanir, VanirContext
 
+nltk = lazy_import("nltk")
+
 
 class Language(VanirCog):
     """Definitions / Translations."""
@@ -36,7 +38,7 @@ class Language(VanirCog):
     ) -> None:
         """Defines a word."""
         url = "https://api.dictionaryapi.dev/api/v2/entries/en/"
-        response = await self.bot.session.get(url + term)
+        response = await self.bot.session.cached_fetch(url + term, service="dictionary")
 
         if response.status != 200:
             embed = ctx.embed(
@@ -45,7 +47,7 @@ class Language(VanirCog):
             )
             return await ctx.reply(embed=embed)
 
-        json = (await response.json())[0]
+        json = response.json()[0]
         title = f"{term}"
 
         if json.get("phonetic"):
@@ -170,9 +172,7 @@ class Language(VanirCog):
         }
         if source_lang != "AUTO":
             json["source_lang"] = source_lang
-        response = await self.bot.session.deepl("/translate", json=json)
-        response.raise_for_status()
-        tsl = (await response.json())["translations"][0]
+        tsl = (await self.bot.session.deepl("/translate", json=json))["translations"][0]
 
         source = LANGUAGE_CODE_MAP[tsl["detected_source_language"]]
         target = LANGUAGE_CODE_MAP[target_lang]
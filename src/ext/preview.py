@@ -3,14 +3,13 @@ import json
 from typing import Any
 
 import discord
-import sympy
 from discord.ext import commands
-from PIL import Image
 
 from assets.color_db import COLOR_INDEX
 from src.constants import ANSI, ANSI_EMOJIS
 from src.types.command import VanirCog, VanirModal, VanirView, vanir_command
 from src.types.core import Vanir, VanirContext
+from src.types.latex import renderer
 from src.util.ux import generate_modal
 
 
@@ -61,46 +60,8 @@ class Preview(VanirCog):
         ),
     ) -> None:
         """Render LaTeX code."""
-        border_px = 10
-
-        output = io.BytesIO()
-        latex = latex.strip("` ").replace("\\\\", "\\").replace("\\n", "\n").strip()
-        preamble = "\\documentclass{article}\n\\usepackage{amsmath}\n\\usepackage{amsfonts}\n\\usepackage{amssymb}\n\\pagestyle{empty}\n\\begin{document}"
-        outline = "\\[ [[LATEX]] \\]" if use_math else "[[LATEX]]"
-        frame = outline + "\n\\end{document}"
-        latex = frame.replace("[[LATEX]]", latex)
-        try:
-            sympy.preview(
-                latex.strip(),
-                preamble=preamble if preambled else None,
-                viewer="BytesIO",
-                outputbuffer=output,
-                fontsize=12,
-                dvioptions=["-D", "400", "-T", "tight", "-z", "0"],
-            )
-        except ValueError as error:
-            breaker = "\\r\\n\\r"
-            index = str(error).rfind(breaker)
-            index_end = str(error).rfind("<to be read again>")
-            message = str(error)[index + len(breaker) : index_end]
-            message = message.replace("\\n", "\n").replace("\\r", "\r")
-            msg = f"Error in parsing LaTeX: {message}"
-            raise ValueError(msg) from error
-        output.seek(0)
-        latex_img = Image.open(output)
-
-        new = Image.new(
-            "RGB",
-            (latex_img.width + border_px * 2, latex_img.height + border_px * 2),
-            (255, 255, 255),
-        )
-        new.paste(latex_img, (border_px, border_px))
-
-        buf = io.BytesIO()
-        new.save(buf, format="PNG")
-        buf.seek(0)
-        file = discord.File(buf, filename="latex.png")
-
+        png = await renderer.render(latex, use_math=use_math, preambled=preambled)
+        file = discord.File(io.BytesIO(png), filename="latex.png")
         await ctx.reply(file=file)
 
 
@@ -3,14 +3,16 @@ from datetime import datetime as dt
 
 import discord
 from discord.ext import commands
-from matplotlib import pyplot as plt
 
 from src.constants import EMOJIS
 from src.types.command import VanirCog, vanir_command
 from src.types.core import Vanir, VanirContext
 from src.util.format import format_children
+from src.util.lazy import lazy_import
 from src.util.time import parse_time
 
+plt = lazy_import("matplotlib.pyplot")
+
 
 class Status(VanirCog):
     emoji = "📊"
@@ -4,9 +4,7 @@ import io
 from inspect import Parameter
 from typing import TYPE_CHECKING
 
-import dataframe_image as dfi
 import discord
-import pandas as pd
 from discord.ext import commands
 
 from src.types.command import (
@@ -18,6 +16,7 @@ from src.types.command import (
 from src.types.interface import TaskIDConverter
 from src.util.command import safe_default
 from src.util.format import wrap_text
+from src.util.lazy import lazy_import
 from src.util.parse import fuzzysearch
 from src.util.ux import generate_modal
 
@@ -27,6 +26,9 @@ if TYPE_CHECKING:
     from src.types.core import Vanir, VanirContext
     from src.types.orm import TASK
 
+dfi = lazy_import("dataframe_image")
+pd = lazy_import("pandas")
+
 
 class Todo(VanirCog):
     """Keep track of what you need to get done."""
@@ -60,10 +60,12 @@ class Waifu(VanirCog):
     @waifu.command()
     async def tags(self, ctx: VanirContext) -> None:
         """Get a list of all available tags on waifu.im."""
-        response = await self.bot.session.get("https://api.waifu.im/tags?full=1")
+        response = await self.bot.session.cached_fetch(
+            "https://api.waifu.im/tags?full=1",
+            service="waifu",
+        )
         response.raise_for_status()
-
-        data = await response.json()
+        data = response.json()
 
         tags = [FullTag.from_dict(tag) for tag in data["versatile"]]
         tags.extend([FullTag.from_dict(tag) for tag in data["nsfw"]])
@@ -136,8 +138,13 @@ async def get_results(
     for tag in exc:
         query += f"&excluded_tags={tag.name}"
 
-    response = await ctx.bot.session.get(f"{url}?{query}", headers=headers)
-    json = await response.json()
+    response = await ctx.bot.session.fetch(
+        "GET",
+        f"{url}?{query}",
+        service="waifu",
+        headers=headers,
+    )
+    json = response.json()
     if "detail" in json:
         raise ValueError(json["detail"] + f"\nuri: {response.url}")
     image_json = json["images"][0]
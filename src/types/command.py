@@ -10,7 +10,6 @@ from asyncio import iscoroutinefunction
 from typing import Any, Awaitable, Callable, Generic, TypeVar
 
 import discord
-import texttable
 from discord import Interaction
 from discord.ext import commands
 from PIL import Image, ImageDraw, ImageFont
@@ -20,6 +19,9 @@ from src.logging import book
 from src.types.core import SFType, Vanir, VanirContext
 from src.types.util import MessageState
 from src.util.format import format_bool
+from src.util.lazy import lazy_import
+
+texttable = lazy_import("texttable")
 
 VanirPagerT = TypeVar("VanirPagerT")
 CommandT = TypeVar("CommandT", bound=commands.Command)
@@ -1,14 +1,15 @@
 from __future__ import annotations
 
 import asyncio
+import contextlib
 import shutil
+import time
 from collections import Counter
 from dataclasses import dataclass
-from typing import Any, TypeVar
+from typing import Any, AsyncIterator, TypeVar
 
 import aiofiles
 import aiohttp
-import asyncpg
 import discord
 from discord.ext import commands
 import wavelink
@@ -16,13 +17,34 @@ import wavelink
 import config
 from src import env
 from src.env import DEEPL_API_KEY
-from src.ext import MODULE_PATHS
+from src.ext import DEFERRED_EXTENSIONS, EXTENSION_DEPENDENCIES, discover_extensions
 from src.logging import book
 from src.logging import main as init_logging
+from src.types.http import (
+    CACHE_TTLS,
+    CACHEABLE_STATUSES,
+    IDEMPOTENT_METHODS,
+    RETRY_STATUSES,
+    SERVICE_TIMEOUTS,
+    CacheEntry,
+    HTTPResult,
+    ResponseCache,
+    ResponseTooLargeError,
+    cache_key,
+    connector_stats,
+    create_connector,
+)
+from src.types.latex import renderer as latex_renderer
+from src.types.loader import ExtensionLoader
 from src.types.orm import TLINK, Currency, DBBase, StarBoard, Status, TLink, Todo
-from src.types.piston import PistonORM, PistonRuntime
+from src.types.piston import PistonORM, piston_catalog
+from src.types.pool import InstrumentedPool, create_pool
+from src.types.resilience import guard
 from src.types.snipe import Buckets, SnipedMessage
+from src.types.startup import StartupTimeline
+from src.util.autocomplete import AutocompleteIndex
 from src.util.autocorrect import FuzzyAC, words
+from src.util.lazy import warm_lazy_modules
 
 SFType = TypeVar(
     "SFType",
@@ -54,12 +76,23 @@ class Vanir(commands.Bot):
 
         self.cache: BotCache = BotCache(self)
 
+        self.pool: InstrumentedPool | None = None
+
         self.launch_time = discord.utils.utcnow()
+        self.startup = StartupTimeline()
 
         self.debug: bool = True
 
         self.piston: PistonORM | None = None
-        self.installed_piston_packages: list[PistonRuntime] = []
+        piston_catalog.listeners.append(self.cache.rebuild_piston_index)
+
+        # sf_receiver type: commands, rebuilt whenever cogs change
+        self.sf_dispatch: dict[type, list[commands.Command]] = {}
+        # concrete snowflake type: commands for every type in its MRO
+        self._sf_resolved: dict[type, list[commands.Command]] = {}
+
+        self._warm_task: asyncio.Task | None = None
+        self.extension_loader: ExtensionLoader | None = None
 
     async def get_context(
         self,
@@ -72,57 +105,96 @@ class Vanir(commands.Bot):
 
     async def setup_hook(self) -> None:
         init_logging()
-        if self.connect_db_on_init:
-            book.info("Instantiating database pool and wrappers")
-            self.pool = await asyncpg.create_pool(**env.PSQL_CONNECTION)
-
-            if self.pool is None:
-                msg = "Could not connect to database"
-                raise RuntimeError(msg)
-
-            databases: list[DBBase] = [
-                self.db_starboard,
-                self.db_currency,
-                self.db_todo,
-                self.db_link,
-                self.db_status,
-            ]
-            for db in databases:
-                db.start(self.pool)
-
-        else:
-            book.info("Not connecting to database")
+        timeline = self.startup
+
+        async def database_and_tlinks() -> None:
+            await timeline.run("database", self.create_pool, timeout=30)
+            await timeline.run("tlinks", self.cache.load_tlinks, timeout=10)
+
+        # independent steps run concurrently, optional services are not waited on
+        await asyncio.gather(
+            database_and_tlinks(),
+            timeline.run("dataset", self.cache.load_dataset, timeout=60),
+            timeline.run("cogs", self.add_cogs, timeout=60),
+            timeline.run("shutil", self.display_shutil, timeout=5, required=False),
+        )
 
         if config.use_system_assets:
             self.piston = PistonORM(self.session)
-            self.installed_piston_packages = await self.piston.runtimes()
+            timeline.background("piston", self.load_piston_runtimes, timeout=10)
+            timeline.background("latex", latex_renderer.warm, timeout=60, retries=0)
+        timeline.background("lavalink", self.create_node, timeout=10)
+
+        book.info(f"Startup timeline:\n{timeline.report()}")
+
+    async def create_pool(self) -> None:
+        if not self.connect_db_on_init:
+            book.info("Not connecting to database")
+            return
+
+        book.info("Instantiating database pool and wrappers")
+        self.pool = await create_pool(**env.PSQL_CONNECTION)
 
-        await self.cache.init()
-        await self.add_cogs()
-        await self.display_shutil()
-        await self.create_node()
+        if self.pool is None:
+            msg = "Could not connect to database"
+            raise RuntimeError(msg)
+
+        databases: list[DBBase] = [
+            self.db_starboard,
+            self.db_currency,
+            self.db_todo,
+            self.db_link,
+            self.db_status,
+        ]
+        for db in databases:
+            db.start(self.pool)
+
+    async def load_piston_runtimes(self) -> None:
+        piston_catalog.start(self.piston)
+        await piston_catalog.refresh()
+
+    async def on_ready(self) -> None:
+        book.info(f"Logged in as {self.user}")
+        # heavy libraries are imported lazily, get them loaded before they are needed
+        self._warm_task = asyncio.create_task(warm_lazy_modules())
 
     async def add_cogs(self) -> None:
-        asyncio.gather(*(self.load_extension(ext) for ext in MODULE_PATHS))
+        self.extension_loader = ExtensionLoader(
+            self,
+            discover_extensions(),
+            dependencies=EXTENSION_DEPENDENCIES,
+            deferred=DEFERRED_EXTENSIONS,
+        )
+        # deferred extensions keep loading in the background after this returns
+        await self.extension_loader.load()
 
         await self.load_extension("jishaku")
 
     async def add_cog(self, cog: commands.Cog) -> None:
         if config.use_system_assets or not getattr(cog, "uses_sys_assets", False):
             await super().add_cog(cog)
+            self.rebuild_sf_dispatch()
+            self.cache.rebuild_command_index()
         else:
             book.info(
                 f"Skipping {cog.qualified_name} because it requires system assets",
             )
 
+    async def remove_cog(self, name: str, /, **kwargs: Any) -> commands.Cog | None:
+        cog = await super().remove_cog(name, **kwargs)
+        self.rebuild_sf_dispatch()
+        self.cache.rebuild_command_index()
+        return cog
+
     async def display_shutil(self) -> None:
         resources = [
             "latex",  # pylatex
             "ffmpeg",
             "ffprobe",  # via ffmpeg install
         ]
-        for resource in resources:
-            if shutil.which(resource) is None:
+        found = await asyncio.to_thread(lambda: [shutil.which(r) for r in resources])
+        for resource, path in zip(resources, found):
+            if path is None:
                 book.warning(f"SHUTIL: Could not find {resource} in PATH")
             else:
                 book.info(f"SHUTIL: Found {resource} in PATH")
@@ -133,12 +205,31 @@ class Vanir(commands.Bot):
         node = wavelink.Node(uri=uri, password="youshallnotpass", client=self)
         await wavelink.Pool.connect(nodes=[node])
 
-    async def dispatch_sf(self, ctx: VanirContext, sf_object: SFType) -> None:
+    def rebuild_sf_dispatch(self) -> None:
+        table: dict[type, list[commands.Command]] = {}
         for command in self.walk_commands():
             if sf_receiver := getattr(command, "sf_receiver", None):
-                if issubclass(type(sf_object), sf_receiver):
-                    book.info(f"Dispatching {command} for {sf_object}")
-                    await ctx.invoke(command, sf_object)
+                table.setdefault(sf_receiver, []).append(command)
+
+        self.sf_dispatch = table
+        self._sf_resolved.clear()
+
+    def sf_handlers(self, sf_type: type) -> list[commands.Command]:
+        """Get every command whose `sf_receiver` is `sf_type` or one of its bases."""
+        handlers = self._sf_resolved.get(sf_type)
+        if handlers is None:
+            handlers = [
+                command
+                for cls in sf_type.__mro__
+                for command in self.sf_dispatch.get(cls, ())
+            ]
+            self._sf_resolved[sf_type] = handlers
+        return handlers
+
+    async def dispatch_sf(self, ctx: VanirContext, sf_object: SFType) -> None:
+        for command in self.sf_handlers(type(sf_object)):
+            book.info(f"Dispatching {command} for {sf_object}")
+            await ctx.invoke(command, sf_object)
 
 
 class VanirTree(discord.app_commands.CommandTree):
@@ -204,18 +295,178 @@ class VanirContext(commands.Context):
 class VanirSession(aiohttp.ClientSession):
     def __init__(self) -> None:
         super().__init__(
+            connector=create_connector(),
+            timeout=SERVICE_TIMEOUTS["default"],
             raise_for_status=False,
             headers={
                 "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:101.0) Gecko/20100101 Firefox/101.0",
             },
         )
+        self.cache = ResponseCache(
+            size=config.http_cache_size,
+            directory=config.http_cache_dir,
+        )
+
+    @contextlib.asynccontextmanager
+    async def service_request(
+        self,
+        method: str,
+        url: str,
+        *,
+        service: str = "default",
+        **kwargs: Any,
+    ) -> AsyncIterator[aiohttp.ClientResponse]:
+        """Make a request with `service`'s timeout. The response is released on exit."""
+        kwargs.setdefault("timeout", SERVICE_TIMEOUTS.get(service, SERVICE_TIMEOUTS["default"]))
+        async with self.request(method, url, **kwargs) as response:
+            yield response
+
+    async def fetch(
+        self,
+        method: str,
+        url: str,
+        *,
+        service: str = "default",
+        idempotent: bool | None = None,
+        **kwargs: Any,
+    ) -> HTTPResult:
+        """
+        Make a request and read the whole response, releasing the connection.
+
+        Requests to a service with a policy in `SERVICE_POLICIES` go through its circuit
+        breaker and bulkhead, and are retried if `idempotent` (by default, if `method` is).
+        """
+
+        async def request() -> HTTPResult:
+            async with self.service_request(method, url, service=service, **kwargs) as response:
+                return HTTPResult(
+                    status=response.status,
+                    url=str(response.url),
+                    method=method,
+                    headers=response.headers,
+                    body=await response.read(),
+                )
+
+        if (service_guard := guard(service)) is None:
+            return await request()
+
+        if idempotent is None:
+            idempotent = method.upper() in IDEMPOTENT_METHODS
+        return await service_guard.call(
+            request,
+            idempotent=idempotent,
+            failed=lambda result: result.status in RETRY_STATUSES,
+        )
+
+    async def stream(
+        self,
+        url: str,
+        *,
+        limit: int,
+        service: str = "default",
+        chunk_size: int = 2**16,
+        **kwargs: Any,
+    ) -> AsyncIterator[bytes]:
+        """
+        GET `url` in chunks, raising `ResponseTooLargeError` once more than `limit` bytes are sent.
+
+        A Content-Length over `limit` is rejected before the body is read at all.
+        Raises `aiohttp.ClientResponseError` for error statuses.
+        """
+        async with self.service_request("GET", url, service=service, **kwargs) as response:
+            response.raise_for_status()
+            if response.content_length is not None and response.content_length > limit:
+                raise ResponseTooLargeError(url, limit, response.content_length)
+
+            received = 0
+            async for chunk in response.content.iter_chunked(chunk_size):
+                received += len(chunk)
+                if received > limit:
+                    raise ResponseTooLargeError(url, limit)
+                yield chunk
+
+    async def download(
+        self,
+        url: str,
+        *,
+        limit: int,
+        service: str = "default",
+        **kwargs: Any,
+    ) -> bytes:
+        """Read all of `url`, without ever holding more than `limit` bytes of it."""
+        buffer = bytearray()
+        async for chunk in self.stream(url, limit=limit, service=service, **kwargs):
+            buffer += chunk
+        return bytes(buffer)
+
+    async def fetch_json(
+        self,
+        method: str,
+        url: str,
+        *,
+        service: str = "default",
+        **kwargs: Any,
+    ) -> Any:
+        """Make a request and parse the response as JSON, raising for error statuses."""
+        result = await self.fetch(method, url, service=service, **kwargs)
+        result.raise_for_status()
+        return result.json()
+
+    async def cached_fetch(
+        self,
+        url: str,
+        *,
+        service: str = "default",
+        ttl: float | None = None,
+        **kwargs: Any,
+    ) -> HTTPResult:
+        """
+        GET a resource through the response cache.
+
+        Fresh responses are served from the cache, stale ones are revalidated with
+        the stored ETag / Last-Modified, and concurrent identical requests share one
+        round trip. Only use this for requests which do not depend on credentials.
+        `ttl` defaults to the service's entry in `CACHE_TTLS`.
+        """
+        key = cache_key(url, kwargs.get("params"))
+        if ttl is None:
+            ttl = CACHE_TTLS.get(service, CACHE_TTLS["default"])
+
+        entry = await self.cache.get(key)
+        if entry is not None and entry.fresh:
+            self.cache.hits += 1
+            return entry.result
+
+        async def refresh() -> HTTPResult:
+            headers = kwargs.pop("headers", None) or {}
+            if entry is not None:
+                headers = entry.validators() | headers
+
+            result = await self.fetch("GET", url, service=service, headers=headers, **kwargs)
+            if result.status == 304 and entry is not None:
+                self.cache.revalidated += 1
+                await self.cache.set(key, CacheEntry(entry.result, time.time() + ttl))
+                return entry.result
+
+            self.cache.misses += 1
+            if result.status in CACHEABLE_STATUSES and "no-store" not in result.headers.get(
+                "Cache-Control",
+                "",
+            ):
+                await self.cache.set(key, CacheEntry(result, time.time() + ttl))
+            return result
+
+        return await self.cache.coalesce(key, refresh)
+
+    def connection_stats(self) -> dict[str, str]:
+        return connector_stats(self.connector)
 
     async def deepl(
         self,
         path: str,
         headers: dict | None = None,
         json: dict | None = None,
-    ) -> aiohttp.ClientResponse:
+    ) -> Any:
         if headers is None:
             headers = {}
         if json is None:
@@ -230,7 +481,15 @@ class VanirSession(aiohttp.ClientSession):
             },
         )
 
-        return await self.post(url + path, headers=headers, json=json)
+        return await self.fetch_json(
+            "POST",
+            url + path,
+            service="deepl",
+            # translations have no side effects
+            idempotent=True,
+            headers=headers,
+            json=json,
+        )
 
 
 class BotCache:
@@ -247,15 +506,57 @@ class BotCache:
             per=lambda snipe: snipe.message.channel.id,
         )
 
-    async def init(self) -> None:
+        # autocomplete candidate tables, rebuilt on cog (re)load and piston changes
+        # (kind, qualified name) for `help`
+        self.command_index = AutocompleteIndex[tuple[str, str]](key=lambda t: t[1])
+        self.piston_language_index = AutocompleteIndex[discord.app_commands.Choice](
+            key=lambda c: c.name,
+            threshold=70,
+        )
+        # language: [version choices]
+        self.piston_versions: dict[str, list[discord.app_commands.Choice]] = {}
+
+    async def load_tlinks(self) -> None:
         book.info("Initializing TLink cache")
         if self.bot.connect_db_on_init:
             self.tlinks = await self.bot.db_link.get_all_links()
 
+    async def load_dataset(self) -> None:
         async with aiofiles.open("assets/dataset.txt") as file:
-            wordset = words(await file.read())
-            counter = Counter(wordset)
-            self.fuzzy_ac = FuzzyAC(counter)
+            text = await file.read()
+
+        # tokenizing and counting the dataset is CPU-bound
+        self.fuzzy_ac = await asyncio.to_thread(lambda: FuzzyAC(Counter(words(text))))
+
+    def rebuild_command_index(self) -> None:
+        values: list[tuple[str, str]] = [
+            ("Module", cog.qualified_name)
+            for cog in self.bot.cogs.values()
+            if not getattr(cog, "hidden", False)
+            and cog.qualified_name.lower() != "jishaku"
+        ]
+        values.extend(
+            (
+                "Group" if isinstance(cmd, commands.Group) else "Command",
+                cmd.qualified_name,
+            )
+            for cmd in self.bot.walk_commands()
+            if not cmd.hidden and not cmd.qualified_name.startswith("jishaku")
+        )
+        self.command_index.rebuild(values)
+
+    def rebuild_piston_index(self) -> None:
+        self.piston_versions = {
+            language: [
+                discord.app_commands.Choice(name=rt.version, value=rt.version)
+                for rt in runtimes[:25]
+            ]
+            for language, runtimes in piston_catalog.by_language.items()
+        }
+        self.piston_language_index.rebuild(
+            discord.app_commands.Choice(name=lang, value=lang)
+            for lang in piston_catalog.by_language
+        )
 
 
 @dataclass
@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import os
+from dataclasses import dataclass
+
+import config
+from src.logging import book
+from src.types.scheduler import FairScheduler, Job
+
+
+@dataclass(eq=False)
+class FFmpegJob(Job[bytes]):
+    args: list[str]
+    stdin: bytes | None
+    timeout: float
+
+
+class FFmpegScheduler(FairScheduler[FFmpegJob, bytes]):
+    noun = "media edits"
+
+    def __init__(
+        self,
+        *,
+        concurrency: int | None = None,
+        user_limit: int = 3,
+        timeout: float = 120,
+    ) -> None:
+        """
+        Runs ffmpeg processes, at most `concurrency` at once, see `FairScheduler`.
+
+        Args:
+        ----
+            concurrency (int | None): Processes running at once. Defaults to the number of CPUs.
+            user_limit (int): Jobs a single user may have queued or running.
+            timeout (float): Seconds a job may run before its process is killed.
+
+        """
+        super().__init__(
+            concurrency=concurrency or os.cpu_count() or 1,
+            user_limit=user_limit,
+        )
+        self.timeout = timeout
+        self.timed_out = 0
+
+    def submit(
+        self,
+        args: list[str],
+        *,
+        user_id: int,
+        stdin: bytes | None = None,
+        timeout: float | None = None,
+    ) -> FFmpegJob:
+        """Queue a job, without waiting for it. Raises ValueError if the user has too many."""
+        return self.enqueue(FFmpegJob(user_id, args, stdin, timeout or self.timeout))
+
+    async def run(
+        self,
+        args: list[str],
+        *,
+        user_id: int,
+        stdin: bytes | None = None,
+        timeout: float | None = None,
+    ) -> bytes:
+        """Run `ffmpeg *args` and return its stdout. Cancelling this cancels the job."""
+        return await self.wait_for(self.submit(args, user_id=user_id, stdin=stdin, timeout=timeout))
+
+    async def _run(self, job: FFmpegJob) -> bytes:
+        args = ["-hide_banner", "-loglevel", "error"]
+        if job.stdin is None:
+            args.append("-nostdin")
+        proc = await asyncio.create_subprocess_exec(
+            "ffmpeg",
+            *args,
+            *job.args,
+            stdin=asyncio.subprocess.DEVNULL if job.stdin is None else asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        try:
+            # communicate drains stdout and stderr together, so a full pipe cannot block ffmpeg
+            stdout, stderr = await asyncio.wait_for(
+                proc.communicate(job.stdin),
+                timeout=job.timeout,
+            )
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            msg = f"ffmpeg took longer than {job.timeout:.0f}s"
+            raise ValueError(msg) from None
+        finally:
+            if proc.returncode is None:
+                with contextlib.suppress(ProcessLookupError):
+                    proc.kill()
+                await proc.wait()
+
+        if proc.returncode != 0:
+            err_msg = stderr.decode("utf-8", errors="replace")
+            book.warning(f"ffmpeg {' '.join(job.args)} failed: {err_msg}")
+            msg = f"ffmpeg returned non-zero status code. {err_msg}"
+            raise ValueError(msg)
+        return stdout
+
+    def stats(self) -> dict[str, str]:
+        stats = super().stats()
+        stats["Failed"] = f"{self.failed} [{self.timed_out} timed out]"
+        return stats
+
+
+scheduler = FFmpegScheduler(
+    concurrency=config.ffmpeg_concurrency,
+    user_limit=config.ffmpeg_user_limit,
+    timeout=config.ffmpeg_timeout,
+)
@@ -0,0 +1,320 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import hashlib
+import itertools
+import json
+import os
+import re
+import shutil
+import time
+from dataclasses import dataclass
+from typing import Any
+
+import config
+from src.logging import book
+from src.util.cache import LRUCache
+from src.util.stats import LatencyStats
+
+
+@dataclass(frozen=True)
+class FormatResult:
+    output: str
+    error: str
+
+
+def find_ruff() -> str | None:
+    """The path of the ruff binary, preferring the one installed with the `ruff` package."""
+    try:
+        from ruff.__main__ import find_ruff_bin
+    except ImportError:
+        return shutil.which("ruff")
+    try:
+        return find_ruff_bin()
+    except FileNotFoundError:
+        return shutil.which("ruff")
+
+
+def _line_starts(text: str) -> list[int]:
+    return [0, *(match.end() for match in re.finditer(r"\r\n|\r|\n", text))]
+
+
+def _offset(text: str, starts: list[int], position: dict[str, int], encoding: str) -> int:
+    """The index in `text` of an LSP position, whose character is counted in `encoding` units."""
+    if position["line"] >= len(starts):
+        return len(text)
+    index = starts[position["line"]]
+    units = 0
+    while units < position["character"] and index < len(text) and text[index] not in "\r\n":
+        units += 2 if encoding == "utf-16" and ord(text[index]) > 0xFFFF else 1
+        index += 1
+    return index
+
+
+def apply_edits(text: str, edits: list[dict[str, Any]], encoding: str) -> str:
+    """Apply LSP TextEdits to `text`."""
+    starts = _line_starts(text)
+    spans = sorted(
+        (
+            _offset(text, starts, edit["range"]["start"], encoding),
+            _offset(text, starts, edit["range"]["end"], encoding),
+            edit["newText"],
+        )
+        for edit in edits
+    )
+    # from the end, so that earlier offsets stay valid
+    for start, end, new_text in reversed(spans):
+        text = text[:start] + new_text + text[end:]
+    return text
+
+
+class RuffServerStoppedError(ValueError):
+    """The ruff server exited or was killed before answering."""
+
+
+class RuffServer:
+    def __init__(self, proc: asyncio.subprocess.Process) -> None:
+        """
+        A running `ruff server`, spoken to with the language server protocol over stdio.
+
+        Requests may be sent concurrently, responses are matched to them by id.
+        Use `start` rather than constructing this directly.
+        """
+        self.proc = proc
+        self.pending: dict[int, asyncio.Future[Any]] = {}
+        self.ids = itertools.count(1)
+        self.encoding = "utf-16"
+        self.closed = False
+        self.reader = asyncio.create_task(self._read_loop())
+
+    @classmethod
+    async def start(cls, binary: str) -> RuffServer:
+        proc = await asyncio.create_subprocess_exec(
+            binary,
+            "server",
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+        server = cls(proc)
+        try:
+            result = await server.request(
+                "initialize",
+                {
+                    "processId": os.getpid(),
+                    "rootUri": None,
+                    "capabilities": {"general": {"positionEncodings": ["utf-32", "utf-16"]}},
+                },
+            )
+            await server.notify("initialized", {})
+        except BaseException:
+            server.kill()
+            raise
+        server.encoding = result["capabilities"].get("positionEncoding", "utf-16")
+        return server
+
+    @property
+    def alive(self) -> bool:
+        return not self.closed
+
+    async def _send(self, message: dict[str, Any]) -> None:
+        body = json.dumps({"jsonrpc": "2.0", **message}).encode()
+        try:
+            self.proc.stdin.write(b"Content-Length: %d\r\n\r\n%s" % (len(body), body))
+            await self.proc.stdin.drain()
+        except ConnectionError:
+            msg = "ruff server stopped"
+            raise RuffServerStoppedError(msg) from None
+
+    async def request(self, method: str, params: dict[str, Any]) -> Any:
+        """Send a request and wait for its result. Raises ValueError if ruff answers with an error."""
+        if not self.alive:
+            msg = "ruff server is not running"
+            raise RuffServerStoppedError(msg)
+        request_id = next(self.ids)
+        future = asyncio.get_running_loop().create_future()
+        self.pending[request_id] = future
+        try:
+            await self._send({"id": request_id, "method": method, "params": params})
+            return await future
+        finally:
+            self.pending.pop(request_id, None)
+
+    async def notify(self, method: str, params: dict[str, Any]) -> None:
+        await self._send({"method": method, "params": params})
+
+    async def _read_loop(self) -> None:
+        try:
+            while True:
+                message = await self._read_message()
+                if "method" in message:
+                    if "id" in message:
+                        # a request from the server, eg. to register capabilities, which this does not use
+                        await self._send({"id": message["id"], "result": None})
+                    continue
+                future = self.pending.get(message.get("id"))
+                if future is None or future.done():
+                    continue
+                if "error" in message:
+                    future.set_exception(ValueError(message["error"].get("message", "ruff server error")))
+                else:
+                    future.set_result(message.get("result"))
+        except Exception as err:  # noqa: BLE001
+            book.warning(f"ruff server stopped: {err!r}")
+        finally:
+            self.closed = True
+            for future in self.pending.values():
+                if not future.done():
+                    future.set_exception(RuffServerStoppedError("ruff server stopped"))
+
+    async def _read_message(self) -> dict[str, Any]:
+        length = None
+        while line := (await self.proc.stdout.readuntil(b"\r\n")).strip():
+            name, _, value = line.decode("ascii").partition(":")
+            if name.strip().lower() == "content-length":
+                length = int(value)
+        if length is None:
+            msg = "message without a Content-Length"
+            raise ValueError(msg)
+        return json.loads(await self.proc.stdout.readexactly(length))
+
+    def kill(self) -> None:
+        self.closed = True
+        self.reader.cancel()
+        if self.proc.returncode is None:
+            with contextlib.suppress(ProcessLookupError):
+                self.proc.kill()
+
+
+class RuffFormatter:
+    def __init__(
+        self,
+        *,
+        concurrency: int = 2,
+        timeout: float = 10,
+        cache_size: int = 256,
+    ) -> None:
+        """
+        Formats Python code with a long-lived `ruff server`, at most `concurrency` at once.
+
+        The server is started on first use, and again if it exits or is killed
+        for taking longer than `timeout`. Formats that were waiting on a killed server
+        are retried once on the new one. Results are cached by a hash of the code.
+
+        Args:
+        ----
+            concurrency (int): Formats in progress at once.
+            timeout (float): Seconds a format may take before the server is killed.
+            cache_size (int): The maximum number of results kept.
+
+        """
+        self.timeout = timeout
+        self.semaphore = asyncio.Semaphore(concurrency)
+
+        self.binary: str | None = None
+        self.server: RuffServer | None = None
+        self.starting = asyncio.Lock()
+        self.documents = itertools.count(1)
+        # hash of the code: result
+        self.cache: LRUCache[str, FormatResult] = LRUCache(cache_size)
+
+        self.run_time = LatencyStats()
+        self.starts = 0
+        self.retried = 0
+        self.timed_out = 0
+
+    async def format(self, code: str) -> FormatResult:
+        """Format `code`. Raises ValueError if ruff is missing, too slow or stops."""
+        key = hashlib.sha256(code.encode()).hexdigest()
+        if (result := self.cache.get(key)) is not None:
+            return result
+
+        async with self.semaphore:
+            start = time.perf_counter()
+            deadline = asyncio.get_running_loop().time() + self.timeout
+            for attempt in range(2):
+                server = await self._server()
+                try:
+                    async with asyncio.timeout_at(deadline):
+                        result = await self._format(server, code)
+                except asyncio.TimeoutError:
+                    self.timed_out += 1
+                    server.kill()
+                    msg = f"ruff took longer than {self.timeout:.0f}s"
+                    raise ValueError(msg) from None
+                except RuffServerStoppedError:
+                    # eg. killed because another format took too long, so try once more on a new one
+                    if attempt:
+                        raise
+                    self.retried += 1
+                else:
+                    break
+            self.run_time.record(time.perf_counter() - start)
+
+        self.cache.set(key, result)
+        return result
+
+    async def _server(self) -> RuffServer:
+        async with self.starting:
+            if self.server is not None and self.server.alive:
+                return self.server
+            if self.binary is None:
+                self.binary = await asyncio.to_thread(find_ruff)
+                if self.binary is None:
+                    msg = "ruff is not installed"
+                    raise ValueError(msg)
+                book.info(f"Formatting with {self.binary}")
+
+            self.server = await asyncio.wait_for(RuffServer.start(self.binary), timeout=self.timeout)
+            self.starts += 1
+            return self.server
+
+    async def _format(self, server: RuffServer, code: str) -> FormatResult:
+        document = {"uri": f"untitled:snippet-{next(self.documents)}.py"}
+        await server.notify(
+            "textDocument/didOpen",
+            {"textDocument": {**document, "languageId": "python", "version": 1, "text": code}},
+        )
+        try:
+            edits = await server.request(
+                "textDocument/formatting",
+                {"textDocument": document, "options": {"tabSize": 4, "insertSpaces": True}},
+            )
+            if edits:
+                return FormatResult(apply_edits(code, edits, server.encoding), "")
+
+            # no edits for both code which is already formatted and code which does not parse
+            report = await server.request("textDocument/diagnostic", {"textDocument": document})
+            error = next((item for item in report.get("items", ()) if item.get("severity") == 1), None)
+            if error is None:
+                return FormatResult(code, "")
+            start = error["range"]["start"]
+            return FormatResult(
+                "",
+                f"error: Failed to parse at {start['line'] + 1}:{start['character'] + 1}: {error['message']}\n",
+            )
+        finally:
+            if server.alive:
+                with contextlib.suppress(ValueError):
+                    await server.notify("textDocument/didClose", {"textDocument": document})
+
+    def stats(self) -> dict[str, str]:
+        return {
+            "Binary": self.binary or "not resolved",
+            "Server": (
+                f"pid {self.server.proc.pid} [{self.starts} starts]"
+                if self.server is not None and self.server.alive
+                else f"not running [{self.starts} starts]"
+            ),
+            "Run": str(self.run_time),
+            **self.cache.stats(),
+            "Timed Out": str(self.timed_out),
+            "Retried": str(self.retried),
+        }
+
+formatter = RuffFormatter(
+    concurrency=config.ruff_concurrency,
+    timeout=config.ruff_timeout,
+    cache_size=config.ruff_cache_size,
+)
@@ -0,0 +1,258 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import hashlib
+import json as jsonlib
+import pickle
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Awaitable, Callable
+
+import aiohttp
+from multidict import CIMultiDict, CIMultiDictProxy
+from yarl import URL
+
+from src.logging import book
+from src.util.cache import coalesce
+
+# per-service request timeouts, in seconds
+SERVICE_TIMEOUTS: dict[str, aiohttp.ClientTimeout] = {
+    "default": aiohttp.ClientTimeout(total=15, connect=5),
+    "deepl": aiohttp.ClientTimeout(total=10, connect=5),
+    "dictionary": aiohttp.ClientTimeout(total=8, connect=5),
+    "waifu": aiohttp.ClientTimeout(total=10, connect=5),
+    # compile + run timeouts are 13s at most, see PistonORM.execute
+    "piston": aiohttp.ClientTimeout(total=30, connect=2),
+    "piston-install": aiohttp.ClientTimeout(total=60 * 10, connect=2),
+    "media": aiohttp.ClientTimeout(total=60, connect=5, sock_read=15),
+}
+
+# how long a cached GET stays fresh per service, in seconds
+# after that it is revalidated with If-None-Match / If-Modified-Since where possible
+CACHE_TTLS: dict[str, float] = {
+    "default": 60,
+    "dictionary": 60 * 60 * 24,
+    "waifu": 60 * 60,
+    "piston": 60 * 5,
+}
+
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+
+# statuses which mean the service is failing or overloaded, rather than the request being wrong
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+# statuses which are cacheable by default, see RFC 9110 15.1
+CACHEABLE_STATUSES = frozenset({200, 203, 204, 300, 301, 404, 405, 410, 414, 501})
+
+
+def create_connector() -> aiohttp.TCPConnector:
+    return aiohttp.TCPConnector(
+        limit=100,
+        limit_per_host=10,
+        ttl_dns_cache=300,
+        keepalive_timeout=30,
+        enable_cleanup_closed=True,
+    )
+
+
+def connector_stats(connector: aiohttp.BaseConnector | None) -> dict[str, str]:
+    """Connection pool statistics. aiohttp does not expose these publicly."""
+    if connector is None or connector.closed:
+        return {"Connector": "closed"}
+
+    acquired = getattr(connector, "_acquired", set())
+    idle = getattr(connector, "_conns", {})
+    per_host = getattr(connector, "_acquired_per_host", {})
+    busiest = max(per_host.items(), key=lambda t: len(t[1]), default=None)
+
+    stats = {
+        "In Use": f"{len(acquired)}/{connector.limit or '∞'}",
+        "Idle": str(sum(len(conns) for conns in idle.values())),
+        "Hosts": str(len(per_host)),
+    }
+    if busiest is not None:
+        stats["Busiest Host"] = (
+            f"{busiest[0].host} [{len(busiest[1])}/{connector.limit_per_host or '∞'}]"
+        )
+    return stats
+
+
+class ResponseTooLargeError(Exception):
+    def __init__(self, url: str, limit: int, size: int | None = None) -> None:
+        self.url = url
+        self.limit = limit
+        self.size = size
+        super().__init__(
+            f"{url} is larger than {limit} bytes" + (f" [{size} bytes]" if size is not None else ""),
+        )
+
+
+@dataclass
+class HTTPResult:
+    """A fully read response, which no longer holds on to its connection."""
+
+    status: int
+    url: str
+    method: str = "GET"
+    headers: CIMultiDictProxy[str] = field(
+        default_factory=lambda: CIMultiDictProxy(CIMultiDict()),
+    )
+    body: bytes = b""
+
+    @property
+    def ok(self) -> bool:
+        return self.status < 400
+
+    def text(self, encoding: str = "utf-8") -> str:
+        return self.body.decode(encoding, errors="replace")
+
+    def json(self) -> Any:
+        return jsonlib.loads(self.body)
+
+    def raise_for_status(self) -> None:
+        if not self.ok:
+            url = URL(self.url)
+            raise aiohttp.ClientResponseError(
+                request_info=aiohttp.RequestInfo(
+                    url,
+                    self.method,
+                    CIMultiDictProxy(CIMultiDict()),
+                    url,
+                ),
+                history=(),
+                status=self.status,
+                message=self.text()[:200],
+                headers=self.headers,
+            )
+
+
+def cache_key(url: str, params: dict[str, Any] | None = None) -> str:
+    return str(URL(url).update_query(params or {}))
+
+
+@dataclass
+class CacheEntry:
+    result: HTTPResult
+    # unix timestamp, so that entries stored on disk survive a restart
+    expires: float
+
+    @property
+    def fresh(self) -> bool:
+        return time.time() < self.expires
+
+    def validators(self) -> dict[str, str]:
+        """Headers to make a conditional request for this entry."""
+        headers = {}
+        if etag := self.result.headers.get("ETag"):
+            headers["If-None-Match"] = etag
+        if last_modified := self.result.headers.get("Last-Modified"):
+            headers["If-Modified-Since"] = last_modified
+        return headers
+
+
+class ResponseCache:
+    def __init__(self, *, size: int = 512, directory: str | None = None) -> None:
+        """
+        An LRU of GET responses, optionally backed by a directory on disk.
+
+        Args:
+        ----
+            size (int): The maximum number of responses kept in memory.
+            directory (str | None): Where to persist responses. Nothing is written to disk if None.
+
+        """
+        self.size = size
+        self.directory = Path(directory) if directory is not None else None
+        self.entries: OrderedDict[str, CacheEntry] = OrderedDict()
+        self.inflight: dict[str, asyncio.Future[HTTPResult]] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self.coalesced = 0
+
+        if self.directory is not None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{hashlib.sha256(key.encode()).hexdigest()}.pickle"
+
+    def _remember(self, key: str, entry: CacheEntry) -> None:
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+
+    async def get(self, key: str) -> CacheEntry | None:
+        """Get an entry, fresh or not, from memory or else from disk."""
+        if (entry := self.entries.get(key)) is not None:
+            self.entries.move_to_end(key)
+            return entry
+
+        if self.directory is None:
+            return None
+        entry = await asyncio.to_thread(self._read, self._path(key))
+        if entry is not None:
+            self._remember(key, entry)
+        return entry
+
+    async def set(self, key: str, entry: CacheEntry) -> None:
+        self._remember(key, entry)
+        if self.directory is not None:
+            await asyncio.to_thread(self._write, self._path(key), entry)
+
+    def invalidate(self, *urls: str) -> None:
+        for url in urls:
+            key = cache_key(url)
+            self.entries.pop(key, None)
+            if self.directory is not None:
+                self._path(key).unlink(missing_ok=True)
+
+    async def coalesce(self, key: str, factory: Callable[[], Awaitable[HTTPResult]]) -> HTTPResult:
+        """Await `factory()`, or the request already in flight for `key`."""
+        if key in self.inflight:
+            self.coalesced += 1
+        return await coalesce(self.inflight, key, factory)
+
+    @staticmethod
+    def _read(path: Path) -> CacheEntry | None:
+        try:
+            status, url, method, headers, body, expires = pickle.loads(path.read_bytes())
+        except FileNotFoundError:
+            return None
+        except (OSError, pickle.UnpicklingError, EOFError, ValueError) as err:
+            book.warning(f"Discarding unreadable cache file {path}: {err}")
+            path.unlink(missing_ok=True)
+            return None
+        result = HTTPResult(status, url, method, CIMultiDictProxy(CIMultiDict(headers)), body)
+        return CacheEntry(result, expires)
+
+    @staticmethod
+    def _write(path: Path, entry: CacheEntry) -> None:
+        result = entry.result
+        data = pickle.dumps(
+            (
+                result.status,
+                result.url,
+                result.method,
+                list(result.headers.items()),
+                result.body,
+                entry.expires,
+            ),
+        )
+        temp = path.with_suffix(".tmp")
+        with contextlib.suppress(OSError):
+            temp.write_bytes(data)
+            temp.replace(path)
+
+    def stats(self) -> dict[str, str]:
+        lookups = self.hits + self.misses + self.revalidated
+        return {
+            "Entries": f"{len(self.entries)}/{self.size}",
+            "Hit Rate": f"{(self.hits + self.revalidated) / lookups:.1%}" if lookups else "n/a",
+            "Hits": f"{self.hits} (+{self.revalidated} revalidated)",
+            "Coalesced": str(self.coalesced),
+        }
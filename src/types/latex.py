@@ -0,0 +1,227 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import io
+import os
+import re
+import signal
+import tempfile
+import time
+from pathlib import Path
+
+from PIL import Image
+
+import config
+from src.logging import book
+from src.util.cache import LRUCache, coalesce
+from src.util.stats import LatencyStats, hit_rate
+
+PREAMBLE = (
+    "\\documentclass{article}\n"
+    "\\usepackage{amsmath}\n"
+    "\\usepackage{amsfonts}\n"
+    "\\usepackage{amssymb}\n"
+    "\\pagestyle{empty}\n"
+    "\\begin{document}"
+)
+# what sympy.preview used when not given a preamble
+BARE_PREAMBLE = (
+    "\\documentclass[varwidth,12pt]{standalone}\n"
+    "\\usepackage{amsmath}\n"
+    "\\usepackage{amsfonts}\n"
+    "\\usepackage{euler}\n"
+    "\\begin{document}"
+)
+DVIPNG_OPTIONS = ["-D", "400", "-T", "tight", "-z", "0"]
+BORDER_PX = 10
+
+# rendered in the background at startup, so that they are answered from the cache
+WARM_EXPRESSIONS = (
+    "x^2",
+    "\\sqrt{2}",
+    "\\frac{a}{b}",
+    "e^{i\\pi} + 1 = 0",
+    "\\int_0^\\infty e^{-x^2} dx = \\frac{\\sqrt{\\pi}}{2}",
+    "\\sum_{n=1}^\\infty \\frac{1}{n^2} = \\frac{\\pi^2}{6}",
+    "x = \\frac{-b \\pm \\sqrt{b^2 - 4ac}}{2a}",
+)
+
+
+def normalize_source(latex: str) -> str:
+    """Undo escaping from Discord and collapse runs of spaces, which LaTeX ignores anyway."""
+    latex = latex.strip("` ").replace("\\\\", "\\").replace("\\n", "\n").strip()
+    return "\n".join(re.sub(r"[ \t]+", " ", line).strip() for line in latex.splitlines())
+
+
+def latex_document(latex: str, *, use_math: bool, preambled: bool) -> str:
+    body = f"\\[ {latex} \\]" if use_math else latex
+    return f"{PREAMBLE if preambled else BARE_PREAMBLE}\n{body}\n\\end{{document}}\n"
+
+
+def latex_error(log: str) -> str:
+    """The error message from latex's output, which starts at a line beginning with "!"."""
+    lines = log.splitlines()
+    start = next((i for i, line in enumerate(lines) if line.startswith("!")), None)
+    if start is None:
+        return log[-500:]
+    end = next(
+        (i for i in range(start, len(lines)) if "<to be read again>" in lines[i]),
+        min(start + 5, len(lines)),
+    )
+    return "\n".join(lines[start:end])
+
+
+def add_border(png: bytes) -> bytes:
+    latex_img = Image.open(io.BytesIO(png))
+    new = Image.new(
+        "RGB",
+        (latex_img.width + BORDER_PX * 2, latex_img.height + BORDER_PX * 2),
+        (255, 255, 255),
+    )
+    new.paste(latex_img, (BORDER_PX, BORDER_PX))
+
+    buf = io.BytesIO()
+    new.save(buf, format="PNG")
+    return buf.getvalue()
+
+
+class LatexRenderer:
+    def __init__(
+        self,
+        *,
+        concurrency: int = 2,
+        timeout: float = 15,
+        cache_size: int = 32 * 2**20,
+    ) -> None:
+        """
+        Renders LaTeX to PNG with latex and dvipng, at most `concurrency` at once.
+
+        Rendered images are cached by their source and options.
+
+        Args:
+        ----
+            concurrency (int): Renders running at once.
+            timeout (float): Seconds a render may take before its processes are killed.
+            cache_size (int): The most the cached images may take up, in bytes.
+
+        """
+        self.timeout = timeout
+        self.semaphore = asyncio.Semaphore(concurrency)
+
+        # (source, use_math, preambled): png
+        self.cache: LRUCache[tuple[str, bool, bool], bytes] = LRUCache(cache_size, weigh=len)
+        # renders in progress, so that identical requests share one
+        self.inflight: dict[tuple[str, bool, bool], asyncio.Future[bytes]] = {}
+
+        self.run_time = LatencyStats()
+        self.failed = 0
+        self.timed_out = 0
+
+    async def render(self, latex: str, *, use_math: bool = True, preambled: bool = True) -> bytes:
+        """Render `latex` to a PNG. Raises ValueError if it does not compile."""
+        key = (normalize_source(latex), use_math, preambled)
+        if (png := self.cache.get(key)) is not None:
+            return png
+
+        return await coalesce(self.inflight, key, lambda: self._render(key))
+
+    async def _render(self, key: tuple[str, bool, bool]) -> bytes:
+        source, use_math, preambled = key
+        async with self.semaphore:
+            start = time.perf_counter()
+            try:
+                with tempfile.TemporaryDirectory() as workdir:
+                    await asyncio.to_thread(
+                        (Path(workdir) / "texput.tex").write_text,
+                        latex_document(source, use_math=use_math, preambled=preambled),
+                        encoding="utf-8",
+                    )
+                    deadline = time.monotonic() + self.timeout
+                    await self._run(
+                        [
+                            "latex",
+                            "-halt-on-error",
+                            "-interaction=nonstopmode",
+                            "-no-shell-escape",
+                            "texput.tex",
+                        ],
+                        workdir,
+                        deadline,
+                    )
+                    await self._run(
+                        ["dvipng", *DVIPNG_OPTIONS, "-o", "texput.png", "texput.dvi"],
+                        workdir,
+                        deadline,
+                    )
+                    png = await asyncio.to_thread((Path(workdir) / "texput.png").read_bytes)
+                png = await asyncio.to_thread(add_border, png)
+            except Exception:
+                self.failed += 1
+                raise
+            finally:
+                self.run_time.record(time.perf_counter() - start)
+
+        self.cache.set(key, png)
+        return png
+
+    async def _run(self, args: list[str], workdir: str, deadline: float) -> None:
+        try:
+            proc = await asyncio.create_subprocess_exec(
+                *args,
+                cwd=workdir,
+                # its own process group, so that helpers it starts, eg. to make fonts, are killed with it
+                start_new_session=True,
+                stdin=asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.STDOUT,
+            )
+        except FileNotFoundError:
+            msg = f"{args[0]} is not installed"
+            raise ValueError(msg) from None
+
+        try:
+            stdout, _ = await asyncio.wait_for(
+                proc.communicate(),
+                timeout=max(deadline - time.monotonic(), 0),
+            )
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            msg = f"Rendering took longer than {self.timeout:g}s"
+            raise ValueError(msg) from None
+        finally:
+            if proc.returncode is None:
+                with contextlib.suppress(ProcessLookupError):
+                    if hasattr(os, "killpg"):
+                        os.killpg(proc.pid, signal.SIGKILL)
+                    else:
+                        proc.kill()
+                await proc.wait()
+
+        if proc.returncode != 0:
+            output = stdout.decode("utf-8", errors="replace")
+            msg = f"Error in parsing LaTeX: {latex_error(output)}"
+            raise ValueError(msg)
+
+    async def warm(self) -> None:
+        """Render `WARM_EXPRESSIONS`, so that the first people to ask for them need not wait."""
+        start = time.perf_counter()
+        await asyncio.gather(*(self.render(latex) for latex in WARM_EXPRESSIONS))
+        book.info(
+            f"Rendered {len(WARM_EXPRESSIONS)} LaTeX expressions in {time.perf_counter() - start:.2f}s",
+        )
+
+    def stats(self) -> dict[str, str]:
+        return {
+            "Render": str(self.run_time),
+            "Cache": f"{len(self.cache)} images [{self.cache.weight / 2**20:.1f}/{self.cache.size / 2**20:.0f} MiB]",
+            "Hit Rate": hit_rate(self.cache.hits, self.cache.misses),
+            "Failed": f"{self.failed} [{self.timed_out} timed out]",
+        }
+
+
+renderer = LatexRenderer(
+    concurrency=config.latex_concurrency,
+    timeout=config.latex_timeout,
+    cache_size=config.latex_cache_size,
+)
@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+from src.logging import book
+
+if TYPE_CHECKING:
+    from discord.ext import commands
+
+
+@dataclass
+class ExtensionLoad:
+    name: str
+    deferred: bool
+    elapsed: float | None = None
+    error: BaseException | None = None
+
+    @property
+    def loaded(self) -> bool:
+        return self.elapsed is not None and self.error is None
+
+    def __str__(self) -> str:
+        if self.error is not None:
+            return f"{self.name}: failed [{self.error.__class__.__name__}: {self.error}]"
+        if self.elapsed is None:
+            return f"{self.name}: pending"
+        return f"{self.name}: {self.elapsed*1000:.2f}ms"
+
+
+class ExtensionLoader:
+    def __init__(
+        self,
+        bot: commands.Bot,
+        extensions: list[str],
+        *,
+        dependencies: dict[str, tuple[str, ...]] | None = None,
+        deferred: set[str] | None = None,
+    ) -> None:
+        """
+        Loads extensions concurrently, in dependency order.
+
+        Args:
+        ----
+            bot (commands.Bot): The bot to load the extensions into.
+            extensions (list[str]): The extensions to load.
+            dependencies (dict[str, tuple[str, ...]]): extension: extensions which must be loaded before it.
+            deferred (set[str]): Extensions which are loaded in the background rather than awaited.
+                                 A deferred extension which a critical one depends on is loaded as critical.
+
+        """
+        self.bot = bot
+        self.dependencies = dependencies or {}
+        deferred = (deferred or set()) - self._required_by(
+            set(extensions) - (deferred or set()),
+        )
+
+        self.loads: dict[str, ExtensionLoad] = {
+            ext: ExtensionLoad(ext, deferred=ext in deferred) for ext in extensions
+        }
+        self._tasks: dict[str, asyncio.Task] = {}
+        self.background: asyncio.Task | None = None
+
+    def _required_by(self, extensions: set[str]) -> set[str]:
+        """Get every extension that `extensions` depend on, directly or not."""
+        required: set[str] = set()
+        stack = list(extensions)
+        while stack:
+            for dep in self.dependencies.get(stack.pop(), ()):
+                if dep not in required:
+                    required.add(dep)
+                    stack.append(dep)
+        return required
+
+    async def load(self) -> list[ExtensionLoad]:
+        """
+        Load every critical extension, and start loading deferred ones in the background.
+
+        Returns the loads of the critical extensions once they are all finished.
+        A failed load is logged and recorded rather than raised.
+        """
+        critical = [n for n, load in self.loads.items() if not load.deferred]
+        deferred = [n for n, load in self.loads.items() if load.deferred]
+
+        # deferred extensions only start once the critical ones are done,
+        # so their (blocking) imports do not hold up startup
+        for name in critical:
+            self._tasks[name] = asyncio.create_task(self._load(name))
+        await asyncio.gather(*(self._tasks[n] for n in critical))
+
+        if deferred:
+            for name in deferred:
+                self._tasks[name] = asyncio.create_task(self._load(name))
+            self.background = asyncio.create_task(self._finish(deferred))
+
+        return [self.loads[n] for n in critical]
+
+    async def _finish(self, names: list[str]) -> None:
+        start = time.perf_counter()
+        await asyncio.gather(*(self._tasks[n] for n in names))
+        book.info(
+            f"Loaded {len(names)} deferred extensions in {time.perf_counter() - start:.2f}s",
+        )
+
+    async def _load(self, name: str) -> None:
+        load = self.loads[name]
+        for dep in self.dependencies.get(name, ()):
+            if dep not in self.loads:
+                load.error = LookupError(f"Unknown dependency {dep}")
+                book.error(f"Not loading {name}: {load.error}")
+                return
+
+            await self._tasks[dep]
+            if not self.loads[dep].loaded:
+                load.error = RuntimeError(f"Dependency {dep} failed to load")
+                book.error(f"Not loading {name}: {load.error}")
+                return
+
+        start = time.perf_counter()
+        try:
+            await self.bot.load_extension(name)
+        except Exception as err:  # noqa: BLE001
+            load.error = err
+            book.error(f"Failed to load {name}: {err}")
+        finally:
+            load.elapsed = time.perf_counter() - start
+
+        if load.error is None:
+            book.info(f"Loaded {name} in {load.elapsed*1000:.2f}ms")
@@ -1,25 +1,61 @@
 from __future__ import annotations
 
 import asyncio
+import concurrent.futures
+import functools
 import io
 import math
+import os
+import tempfile
+import textwrap
+from collections import OrderedDict, deque
 from dataclasses import dataclass
-from typing import TYPE_CHECKING, Generic, TypeVar
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Generic, Iterable, Iterator, TypeVar
 from urllib.parse import urlparse
 
-import cv2
+import aiohttp
 import discord
 from discord.ext import commands
-from wand.image import Image
+from PIL import Image as PILImage
+from PIL import ImageDraw, ImageFont, ImageSequence, JpegImagePlugin
 
+import config
 from src.constants import MONOSPACE_FONT_HEIGHT_RATIO
-from src.logging import book
+from src.types.ffmpeg import scheduler
+from src.types.http import ResponseTooLargeError
+from src.types.media_cache import hash_bytes, result_cache, result_key
+from src.util.lazy import lazy_import
 from src.util.regex import URL_REGEX
 
 if TYPE_CHECKING:
+    import cv2
+    from wand.image import Image
+
     from src.types.core import VanirContext
 
-MediaSource = TypeVar("MediaSource", cv2.Mat, Image)
+wand_image = lazy_import("wand.image")
+
+MediaSource = TypeVar("MediaSource", "cv2.Mat", "Image")
+
+# formats which Pillow can read and write, and so are edited without Wand where possible
+PILLOW_FORMATS = frozenset({"JPEG", "PNG", "WEBP", "GIF", "BMP"})
+ANIMATED_FORMATS = frozenset({"GIF", "WEBP"})
+
+# at most this many pixels across all frames of an animation, 128MiB as RGBA.
+# Pillow keeps every frame while saving, as RGBA for WebP and a byte per pixel for GIF
+MAX_ANIMATION_PIXELS = 2**25
+
+# for editing the frames of animations in parallel
+FRAME_WORKERS = os.cpu_count() or 1
+FRAME_POOL = concurrent.futures.ThreadPoolExecutor(FRAME_WORKERS, thread_name_prefix="vanir-frames")
+
+# in bytes, for attachments and downloaded media alike
+MAX_MEDIA_SIZE = 10**7
+
+# an operation's name and options, eg. ("transpose", {"dir": 1})
+# for videos these are ffmpeg filters, for images Wand `Image` methods
+MediaOp = tuple[str, dict[str, str | int | float]]
 
 
 @dataclass
@@ -35,31 +71,59 @@ class MediaInfo:
 class MediaInterface(Generic[MediaSource]):
     initial_info: MediaInfo
 
+    def __init__(self, blob: bytes, initial_info: MediaInfo) -> None:
+        self.blob = blob
+        self.initial_info = initial_info
+        # operations which have not been applied yet, see `read`
+        self.ops: list[MediaOp] = []
+        # every operation since the media was found, and the hash of it then
+        self.history: list[MediaOp] = []
+        self.source_hash: str | None = None
+        self.loop = asyncio.get_running_loop()
+
     @classmethod
     async def create(cls, source: bytes) -> MediaInterface: ...
 
     @classmethod
     async def from_blob(cls, url: str, blob: bytes) -> None: ...
 
+    def queue(self, name: str, **options: str | int | float) -> None:
+        self.ops.append((name, options))
+        self.history.append((name, options))
+
     async def rotate(self, degrees: int) -> None: ...
 
     async def flip(self) -> None: ...
 
     async def flop(self) -> None: ...
 
-    async def read(self) -> bytes: ...
+    async def render(self, ops: list[MediaOp]) -> bytes: ...
 
-    async def to_file(self) -> discord.File: ...
+    async def read(self) -> bytes:
+        """Apply any pending operations, then get the result."""
+        if not self.ops:
+            return self.blob
 
-    async def caption(self, text: str) -> bytes: ...
+        if self.source_hash is None:
+            # nothing has been rendered yet, so this is still the media as it was found
+            self.source_hash = await asyncio.to_thread(hash_bytes, self.blob)
+        key = result_key(self.source_hash, self.history)
 
+        blob = await result_cache.get(key)
+        if blob is None:
+            blob = await self.render(self.ops)
+            await result_cache.set(key, blob)
+
+        self.blob = blob
+        self.ops = []
+        return self.blob
+
+    async def to_file(self) -> discord.File: ...
+
+    async def caption(self, text: str) -> None: ...
 
-class ImageInterface(MediaInterface[Image]):
-    def __init__(self, image: Image, initial_info: MediaInfo) -> None:
-        self.image = image
-        self.initial_info = initial_info
-        self.loop = asyncio.get_running_loop()
 
+class ImageInterface(MediaInterface["Image"]):
     @classmethod
     async def create(
         cls,
@@ -67,7 +131,7 @@ class ImageInterface(MediaInterface[Image]):
         initial_info: MediaInfo,
     ) -> ImageInterface:
         check_media_size(source)
-        return cls(Image(blob=await source.read()), initial_info)
+        return cls(await source.read(), initial_info)
 
     @classmethod
     async def from_blob(
@@ -76,125 +140,448 @@ class ImageInterface(MediaInterface[Image]):
         blob: bytes,
         initial_info: MediaInfo,
     ) -> ImageInterface:
-        return cls(Image(blob=blob), initial_info)
+        return cls(blob, initial_info)
 
-    async def rotate(self, degrees: int) -> bytes:
-        await self.loop.run_in_executor(None, self.image.rotate, degrees)
-        return await self.read()
+    async def rotate(self, degrees: int) -> None:
+        self.queue("rotate", degree=degrees)
 
-    async def flip(self) -> bytes:
-        await self.loop.run_in_executor(None, self.image.flip)
-        return await self.read()
+    async def flip(self) -> None:
+        self.queue("flip")
 
-    async def flop(self) -> bytes:
-        await self.loop.run_in_executor(None, self.image.flop)
-        return await self.read()
+    async def flop(self) -> None:
+        self.queue("flop")
 
-    async def read(self) -> bytes:
-        return await self.loop.run_in_executor(None, self.image.make_blob, "png")
+    async def caption(self, text: str) -> None:
+        self.queue("caption", text=text)
+
+    async def render(self, ops: list[MediaOp]) -> bytes:
+        return await self.loop.run_in_executor(None, self._render, ops)
+
+    def _render(self, ops: list[MediaOp]) -> bytes:
+        if (blob := edit_animation(self.blob, ops)) is not None:
+            return blob
+        if (blob := edit_still(self.blob, ops)) is not None:
+            return blob
+
+        with wand_image.Image(blob=self.blob) as image:
+            for name, options in ops:
+                getattr(image, name)(**options)
+            return image.make_blob("png")
 
     async def to_file(self) -> discord.File:
-        return discord.File(io.BytesIO(await self.read()), filename="media.png")
+        blob = await self.read()
+        return discord.File(io.BytesIO(blob), filename=f"media.{image_format(blob)}")
+
+
+def pillow_transposes(ops: list[MediaOp]) -> list[PILImage.Transpose] | None:
+    """The Pillow equivalent of a chain of Wand operations, or None if there is none."""
+    transposes = []
+    for name, options in ops:
+        match name, options.get("degree", 0) % 360:
+            case "flip", _:
+                transposes.append(PILImage.Transpose.FLIP_TOP_BOTTOM)
+            case "flop", _:
+                transposes.append(PILImage.Transpose.FLIP_LEFT_RIGHT)
+            case "rotate", 0:
+                pass
+            # Wand rotates clockwise, Pillow counterclockwise
+            case "rotate", 90:
+                transposes.append(PILImage.Transpose.ROTATE_270)
+            case "rotate", 180:
+                transposes.append(PILImage.Transpose.ROTATE_180)
+            case "rotate", 270:
+                transposes.append(PILImage.Transpose.ROTATE_90)
+            case _:
+                return None
+    return transposes
+
+
+def edit_still(blob: bytes, ops: list[MediaOp]) -> bytes | None:
+    """
+    Apply `ops` to a still image with Pillow, saving it in its original format.
+
+    Right angle rotations and flips just move pixels around, so JPEGs are saved
+    with their original quantization tables and subsampling, and come out at the
+    same quality. Returns None if Pillow cannot do this, eg. for arbitrary rotations.
+    """
+    if (image := open_image(blob)) is None:
+        return None
+    with image:
+        if image.format not in PILLOW_FORMATS or getattr(image, "n_frames", 1) > 1:
+            return None
+        if (func := pillow_frame_op(ops, resample=False)) is None:
+            return None
+
+        image_format = image.format
+        result = func(image)
+
+        save_options = {}
+        if icc_profile := image.info.get("icc_profile"):
+            save_options["icc_profile"] = icc_profile
+        if "transparency" in image.info and result.mode == image.mode:
+            save_options["transparency"] = image.info["transparency"]
+        if image_format == "JPEG":
+            save_options["qtables"] = image.quantization
+            save_options["subsampling"] = JpegImagePlugin.get_sampling(image)
+
+        output = io.BytesIO()
+        result.save(output, format=image_format, **save_options)
+        return output.getvalue()
+
+
+def pillow_frame_op(
+    ops: list[MediaOp],
+    *,
+    resample: bool = True,
+) -> Callable[[PILImage.Image], PILImage.Image] | None:
+    """
+    A function applying `ops` to a single frame with Pillow, or None if there is none.
+
+    If not `resample`, operations which interpolate pixels (arbitrary rotations) are not allowed.
+    """
+    steps: list[Callable[[PILImage.Image], PILImage.Image]] = []
+    for name, options in ops:
+        if (transposes := pillow_transposes([(name, options)])) is not None:
+            steps.extend(functools.partial(PILImage.Image.transpose, method=t) for t in transposes)
+        elif name == "caption":
+            steps.append(functools.partial(caption_frame, layout=CaptionLayout.wrap(options["text"])))
+        elif name == "rotate" and resample:
+            steps.append(
+                functools.partial(
+                    PILImage.Image.rotate,
+                    # Wand rotates clockwise, Pillow counterclockwise
+                    angle=-options["degree"],
+                    resample=PILImage.Resampling.BICUBIC,
+                    expand=True,
+                ),
+            )
+        else:
+            return None
+
+    def apply(frame: PILImage.Image) -> PILImage.Image:
+        for step in steps:
+            frame = step(frame)
+        return frame
+
+    return apply
+
+
+def map_frames(
+    func: Callable[[PILImage.Image], PILImage.Image],
+    frames: Iterable[PILImage.Image],
+) -> Iterator[PILImage.Image]:
+    """
+    Apply `func` to `frames` across `FRAME_POOL`, in order.
+
+    Frames are only decoded a few ahead of the ones being worked on,
+    rather than all at once.
+    """
+    window = FRAME_WORKERS * 2
+    pending: deque[concurrent.futures.Future[PILImage.Image]] = deque()
+    for frame in frames:
+        pending.append(FRAME_POOL.submit(func, frame))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def edit_animation(blob: bytes, ops: list[MediaOp]) -> bytes | None:
+    """
+    Apply `ops` to every frame of an animated GIF or WebP, keeping each frame's duration.
+
+    Returns None if `blob` is not an animation, or Pillow cannot do `ops`.
+    Raises ValueError for animations over `MAX_ANIMATION_PIXELS`.
+    """
+    if (image := open_image(blob)) is None:
+        return None
+    with image:
+        if image.format not in ANIMATED_FORMATS or getattr(image, "n_frames", 1) <= 1:
+            return None
+        if (func := pillow_frame_op(ops)) is None:
+            return None
+        if image.n_frames * image.width * image.height > MAX_ANIMATION_PIXELS:
+            msg = f"Animation is too large to edit [{image.n_frames} frames of {image.width}x{image.height}]"
+            raise ValueError(msg)
+
+        durations: list[int] = []
+
+        def frames() -> Iterator[PILImage.Image]:
+            for frame in ImageSequence.Iterator(image):
+                # frames can each have their own palette, so edit them in full color
+                rgba = frame.convert("RGBA")
+                # only known for WebP once the frame is loaded
+                durations.append(frame.info.get("duration", 100))
+                yield rgba
+
+        edited = map_frames(func, frames())
+        first = next(edited)
+
+        save_options = {}
+        # no loop means play once, whereas loop=0 means forever
+        if "loop" in image.info:
+            save_options["loop"] = image.info["loop"]
+        if image.format == "GIF":
+            # clear each frame before drawing the next, so transparent areas do not smear
+            save_options["disposal"] = 2
+        output = io.BytesIO()
+        first.save(
+            output,
+            format=image.format,
+            save_all=True,
+            # the rest are edited as Pillow asks for them
+            append_images=edited,
+            duration=durations,
+            **save_options,
+        )
+        return output.getvalue()
+
+
+@dataclass(frozen=True)
+class CaptionLayout:
+    """
+    A caption in a white box above some media, sized relative to the media's width.
+
+    Shared by images (drawn with Pillow) and videos (drawn with ffmpeg),
+    so that both come out looking the same.
+    """
+
+    lines: tuple[str, ...]
+
+    chars_per_line = 30
+    # of the media's width, on either side of the text
+    margin = 0.05
+    # of the font size
+    line_height = 1.25
+
+    @classmethod
+    def wrap(cls, text: str) -> CaptionLayout:
+        lines = [
+            line
+            for paragraph in text.splitlines() or [""]
+            for line in textwrap.wrap(paragraph, cls.chars_per_line) or [""]
+        ]
+        return cls(tuple(lines))
+
+    @property
+    def text(self) -> str:
+        return "\n".join(self.lines)
+
+    @property
+    def font_scale(self) -> float:
+        """The font size, as a fraction of the media's width."""
+        char_width = (1 - 2 * self.margin) / self.chars_per_line
+        return char_width * MONOSPACE_FONT_HEIGHT_RATIO
+
+    @property
+    def height_scale(self) -> float:
+        """The height of the box, as a fraction of the media's width."""
+        # half a line of space above and below the text
+        return (len(self.lines) * self.line_height + 1) * self.font_scale
+
+    def font_size(self, width: int) -> int:
+        return max(1, round(width * self.font_scale))
+
+    def height(self, width: int) -> int:
+        # even, since most video pixel formats need even dimensions
+        return 2 * math.ceil(width * self.height_scale / 2)
+
+    def height_expression(self, width: str) -> str:
+        """`height` as an ffmpeg expression, where `width` is the variable holding the width."""
+        return f"2*ceil({width}*{self.height_scale:.6f}/2)"
+
+    def line_top_expression(self, index: int, width: str, line_height: str) -> str:
+        """
+        The top of line `index` as an ffmpeg expression, centering the lines in the box.
+
+        `line_height` holds the height of a line of text in the font, and lines are
+        spaced like Pillow's `multiline_text`, with `font_size * (line_height - 1)`.
+        """
+        spacing = f"{width}*{self.font_scale * (self.line_height - 1):.6f}"
+        count = len(self.lines)
+        block = f"({count}*{line_height}+{count - 1}*{spacing})"
+        return f"({self.height_expression(width)}-{block})/2+{index}*({line_height}+{spacing})"
+
+
+@functools.lru_cache(maxsize=64)
+def caption_font(size: int) -> ImageFont.FreeTypeFont:
+    return ImageFont.truetype("assets/Monospace.ttf", size=size)
+
+
+def caption_frame(frame: PILImage.Image, layout: CaptionLayout) -> PILImage.Image:
+    # eg. palette and greyscale images cannot have black text on white drawn on them directly
+    if frame.mode not in ("RGB", "RGBA"):
+        frame = frame.convert("RGBA" if frame.mode in ("P", "PA", "LA") else "RGB")
+
+    height = layout.height(frame.width)
+    font_size = layout.font_size(frame.width)
+
+    result = PILImage.new(frame.mode, (frame.width, frame.height + height), "white")
+    result.paste(frame, (0, height))
+    ImageDraw.Draw(result).multiline_text(
+        (frame.width / 2, height / 2),
+        layout.text,
+        font=caption_font(font_size),
+        fill="black",
+        anchor="mm",
+        align="center",
+        spacing=round(font_size * (layout.line_height - 1)),
+    )
+    return result
+
+
+def open_image(blob: bytes) -> PILImage.Image | None:
+    """Open an image with Pillow, which only reads its header until the pixels are used."""
+    try:
+        return PILImage.open(io.BytesIO(blob))
+    except (PILImage.UnidentifiedImageError, OSError):
+        return None
+
+
+def image_format(blob: bytes) -> str:
+    """The file extension for an image, read from its header. Defaults to png."""
+    if (image := open_image(blob)) is None:
+        return "png"
+    with image:
+        return (image.format or "png").lower()
 
 
-class VideoInterface(MediaInterface[cv2.Mat]):
-    def __init__(self, url: str, blob: bytes, initial_info: MediaInfo) -> None:
+class VideoInterface(MediaInterface["cv2.Mat"]):
+    def __init__(
+        self,
+        url: str,
+        blob: bytes,
+        initial_info: MediaInfo,
+        *,
+        user_id: int = 0,
+    ) -> None:
+        super().__init__(blob, initial_info)
         self.url = urlparse(url)
-        self.blob = blob
-        self.initial_info = initial_info
-        self.loop = asyncio.get_running_loop()
+        # whose ffmpeg queue this media's jobs go in
+        self.user_id = user_id
 
     @classmethod
     async def create(
         cls,
         source: discord.Attachment,
         initial_info: MediaInfo,
+        *,
+        user_id: int = 0,
     ) -> VideoInterface:
         check_media_size(source)
-        return cls(source.url, await source.read(), initial_info)
+        return cls(source.url, await source.read(), initial_info, user_id=user_id)
 
     @classmethod
-    async def from_blob(cls, url: str, blob: bytes, info: MediaInfo) -> VideoInterface:
-        return cls(url, blob, info)
+    async def from_blob(
+        cls,
+        url: str,
+        blob: bytes,
+        info: MediaInfo,
+        *,
+        user_id: int = 0,
+    ) -> VideoInterface:
+        return cls(url, blob, info, user_id=user_id)
 
-    async def rotate(self, degrees: int) -> bytes:
+    async def rotate(self, degrees: int) -> None:
         if degrees % 90 != 0:
             msg = "Degrees must be a multiple of 90"
             raise ValueError(msg)
         n_rots = degrees // 90 % 4
 
+        # https://stackoverflow.com/questions/3937387/rotating-videos-with-ffmpeg
         match n_rots:
             case 0:
-                params = ""  # 0 deg
+                pass  # 0 deg
             case 1:
-                params = '-vf "transpose=1"'  # 90 CW
+                self.queue("transpose", dir=1)  # 90 CW
             case 2:
-                params = '-vf "vflip" -vf "hflip"'
+                self.queue("vflip")
+                self.queue("hflip")
             case 3:
-                params = '-vf "transpose=2"'  # 90 CCW
+                self.queue("transpose", dir=2)  # 90 CCW
             case _:
                 raise RuntimeError(degrees, n_rots)
 
-        self.blob = await self.send_proc_pipe(params)
-        return self.blob
+    async def flip(self) -> None:
+        self.queue("vflip")
 
-    async def caption(self, text: str) -> bytes:
-        book.info("Here")
+    async def flop(self) -> None:
+        self.queue("hflip")
+
+    async def caption(self, text: str) -> None:
         # https://stackoverflow.com/questions/17623676/text-on-video-ffmpeg
         # https://stackoverflow.com/questions/46671252/how-to-add-black-borders-to-video
-        chars_per_line = 30
-        n_lines = math.ceil(len(text) / chars_per_line)
-
-        font_width = 10
-        font_height = MONOSPACE_FONT_HEIGHT_RATIO * font_width
+        layout = CaptionLayout.wrap(text)
+
+        # extend the top of the video with white pixels, then write the text there
+        height = layout.height_expression("iw")
+        self.queue("pad", h=f"ih+{height}", y=height, color="white")
+        # a drawtext per line, so that each is centered on its own like with Pillow
+        for index, line in enumerate(layout.lines):
+            if not line:
+                continue
+            self.queue(
+                "drawtext",
+                text=line,
+                expansion="none",
+                fontfile="./assets/Monospace.ttf",
+                fontsize=f"w*{layout.font_scale:.6f}",
+                fontcolor="black",
+                x="(w-text_w)/2",
+                y=layout.line_top_expression(index, "w", "line_h"),
+            )
 
-        pix_buff = math.ceil(n_lines * font_height)
+    async def to_file(self) -> discord.File:
+        return discord.File(io.BytesIO(await self.read()), filename="media.webm")
+
+    async def render(self, ops: list[MediaOp]) -> bytes:
+        """Apply `ops` to the blob in one ffmpeg pass: one decode, one filter graph, one encode."""
+        graph = build_filter_chain(ops)
+        # mp4 can keep its index at the end of the file, so ffmpeg needs to seek the input
+        with tempfile.TemporaryDirectory() as directory:
+            source = Path(directory) / "source"
+            await asyncio.to_thread(source.write_bytes, self.blob)
+            return await self.send_proc_pipe(
+                [
+                    "-i",
+                    str(source),
+                    "-filter_complex",
+                    f"[0:v]{graph}[v]",
+                    "-map",
+                    "[v]",
+                    "-map",
+                    "0:a?",
+                    "-c:a",
+                    "copy",
+                ],
+            )
 
-        # create a buffer of white pixels to extend the video
-        extend_padding_params = (
-            f'-filter_complex "[0]pad=h={pix_buff}+ih:color=white:x=0:y=0"'
+    async def send_proc_pipe(self, params: list[str]) -> bytes:
+        return await scheduler.run(
+            [*params, "-f", "matroska", "pipe:1"],
+            user_id=self.user_id,
         )
-        self.blob = await self.send_proc_pipe(extend_padding_params)
-
-        text_dict = {
-            "text": f"'{text}'",
-            "fontfile": "./assets/Monospace.ttf",
-            "fontsize": font_height,
-            "fontcolor": "black",
-        }
-        text_params = f"-vf {':'.join(f'{k}={v}' for k, v in text_dict.items())}"
-        self.blob = await self.send_proc_pipe(text_params)
-        return self.blob
 
-    async def to_file(self) -> discord.File:
-        return discord.File(io.BytesIO(self.blob), filename="media.webm")
 
-    async def read(self) -> bytes:
-        return self.blob
+def build_filter_chain(ops: list[MediaOp]) -> str:
+    """Join `ops` into a filter chain, eg. `transpose=dir=1,pad=h=ih+16:y=16`."""
+    filters = []
+    for name, options in ops:
+        if options:
+            name += "=" + ":".join(f"{k}={escape_filter_value(v)}" for k, v in options.items())
+        filters.append(name)
+    return ",".join(filters)
 
-    async def send_proc_pipe(self, params: str) -> bytes:
-        # TODO(statikana): Semaphore for controlling max number of processes open at any one time
-        # TODO(statikana): Share processes?
-        # https://stackoverflow.com/questions/3937387/rotating-videos-with-ffmpeg
 
-        command = (
-            f'ffmpeg -hide_banner -loglevel error -i "{self.url.geturl()}" {params} -f '
-            f"matroska pipe:1"
-        )
-        proc = await asyncio.create_subprocess_shell(
-            cmd=command,
-            stdin=asyncio.subprocess.PIPE,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE,
-        )
-        rt_code = await proc.wait()
-        if rt_code != 0:
-            err_msg = (await proc.stderr.read()).decode("utf-8")
-            book.warning(err_msg, params=params)
-            msg = f"ffmpeg returned non-zero status code. {err_msg}"
-            raise ValueError(msg)
-
-        return await proc.stdout.read()
+def escape_filter_value(value: object) -> str:
+    """Escape a filter option's value, see "Notes on filtergraph escaping" in ffmpeg-filters(1)."""
+    value = str(value)
+    # first for the option parser, then for the filtergraph parser
+    for char in "\\':":
+        value = value.replace(char, "\\" + char)
+    for char in "\\'[],;":
+        value = value.replace(char, "\\" + char)
+    return value
 
 
 class MediaConverter:
@@ -202,7 +589,7 @@ class MediaConverter:
         "mp4",
         "webm",
     )
-    image_formats = ("jpeg", "jpg", "png", "gif")
+    image_formats = ("jpeg", "jpg", "png", "gif", "webp")
 
     async def convert(
         self,
@@ -213,14 +600,23 @@ class MediaConverter:
         if data is not None:
             return data
 
-        if ctx.message.reference is not None:
-            reference = await ctx.channel.fetch_message(
-                ctx.message.reference.message_id,
-            )
+        if (ref := ctx.message.reference) is not None:
+            reference = ref.resolved if isinstance(ref.resolved, discord.Message) else None
+            if reference is None:
+                reference = recent_media.get(ctx.channel.id, ref.message_id)
+            if reference is None:
+                reference = await ctx.channel.fetch_message(ref.message_id)
             return await find_content(ctx, reference)
 
-        async for h_msg in ctx.channel.history(limit=8):
-            data = await find_content(ctx, h_msg)
+        recent = recent_media.before(ctx.channel.id, ctx.message.id)
+        if not recent:
+            # nothing seen here since startup, so look back once and remember what was found
+            recent = [message async for message in ctx.channel.history(limit=8, before=ctx.message)]
+            for message in reversed(recent):
+                recent_media.add(message)
+
+        for message in recent:
+            data = await find_content(ctx, message)
             if data is not None:
                 return data
 
@@ -228,10 +624,104 @@ class MediaConverter:
         raise ValueError(msg)
 
 
+def media_url(content: str) -> tuple[str, str] | None:
+    """The first URL in `content` and its extension, if it looks like supported media."""
+    urls = URL_REGEX.findall(content)
+    if not urls:
+        return None
+    url = urls[0]  # only test the first URL
+    path = urlparse(url).path
+    extension = path[path.rfind(".") + 1 :].lower()
+    if extension not in MediaConverter.image_formats + MediaConverter.video_formats:
+        return None
+    return url, extension
+
+
+def has_media(message: discord.Message) -> bool:
+    return any(
+        atch.content_type is not None and atch.content_type.startswith(("image/", "video/"))
+        for atch in message.attachments
+    ) or media_url(message.content) is not None
+
+
+class RecentMedia:
+    def __init__(self, *, per_channel: int = 10, channels: int = 1000) -> None:
+        """
+        The latest messages with media in each channel, so that media commands
+        can find their source without fetching the channel's history.
+
+        Args:
+        ----
+            per_channel (int): Messages kept for each channel.
+            channels (int): Channels kept, least recently active are forgotten first.
+
+        """
+        self.per_channel = per_channel
+        self.channels = channels
+        # channel id: messages, oldest first
+        self.messages: OrderedDict[int, deque[discord.Message]] = OrderedDict()
+
+    def add(self, message: discord.Message) -> None:
+        """Remember `message` if it has media, replacing any older version of it, eg. when edited."""
+        self.forget(message.channel.id, message.id)
+        if not has_media(message):
+            return
+
+        channel_id = message.channel.id
+        queue = self.messages.get(channel_id)
+        if queue is None:
+            queue = self.messages[channel_id] = deque(maxlen=self.per_channel)
+            while len(self.messages) > self.channels:
+                self.messages.popitem(last=False)
+        self.messages.move_to_end(channel_id)
+        queue.append(message)
+        if len(queue) > 1 and queue[-2].id > message.id:
+            # an older message was edited to have media, keep the queue in the order they were sent
+            self.messages[channel_id] = deque(sorted(queue, key=lambda m: m.id), maxlen=self.per_channel)
+
+    def forget(self, channel_id: int, message_id: int) -> None:
+        queue = self.messages.get(channel_id)
+        if queue is None:
+            return
+        for message in queue:
+            if message.id == message_id:
+                queue.remove(message)
+                break
+        if not queue:
+            del self.messages[channel_id]
+
+    def get(self, channel_id: int, message_id: int) -> discord.Message | None:
+        for message in self.messages.get(channel_id, ()):
+            if message.id == message_id:
+                return message
+        return None
+
+    def before(self, channel_id: int, message_id: int) -> list[discord.Message]:
+        """Messages in the channel sent before `message_id`, newest first."""
+        # a list rather than a generator, as new messages may arrive while the caller awaits
+        return [
+            message
+            for message in reversed(self.messages.get(channel_id, ()))
+            if message.id < message_id
+        ]
+
+    def stats(self) -> dict[str, str]:
+        return {
+            "Channels": f"{len(self.messages)}/{self.channels}",
+            "Messages": str(sum(len(queue) for queue in self.messages.values())),
+        }
+
+
+recent_media = RecentMedia(
+    per_channel=config.recent_media_per_channel,
+    channels=config.recent_media_channels,
+)
+
+
 def check_media_size(obj: discord.Attachment | bytes | None) -> None:
     if obj is not None:
-        if (isinstance(obj, discord.Attachment) and obj.size > (10**7)) or (
-            isinstance(obj, bytes) and len(obj) > (10**7)
+        if (isinstance(obj, discord.Attachment) and obj.size > MAX_MEDIA_SIZE) or (
+            isinstance(obj, bytes) and len(obj) > MAX_MEDIA_SIZE
         ):
             raise commands.CommandInvokeError(
                 ValueError("Attachment size cannot be more than 10 mB"),
@@ -247,35 +737,34 @@ async def find_content(
         info = MediaInfo.from_atch(atch)
 
         if mime.startswith("video/"):
-            return await VideoInterface.create(atch, info)
+            return await VideoInterface.create(atch, info, user_id=ctx.author.id)
 
         elif mime.startswith("image/"):
             return await ImageInterface.create(atch, info)
 
-    urls = URL_REGEX.findall(msg.content)
-    if urls:
-        url = urls[0]  # only test the first URL
-        parsed = urlparse(url)
-        path = parsed.path
+    if (found := media_url(msg.content)) is not None:
+        url, extension = found
+        try:
+            blob = await ctx.bot.session.download(
+                url,
+                limit=MAX_MEDIA_SIZE,
+                service="media",
+                allow_redirects=False,
+            )
+        except ResponseTooLargeError:
+            raise commands.CommandInvokeError(
+                ValueError("Attachment size cannot be more than 10 mB"),
+            ) from None
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            return None
+
         try:
-            extension = path[path.rfind(".") + 1 :].lower()
-            if (
-                extension
-                not in MediaConverter.image_formats + MediaConverter.video_formats
-            ):
-                msg = "Invalid extension"
-                raise ValueError(msg)
-
-            response = await ctx.bot.session.get(url, allow_redirects=False)
-            blob = await response.read()
-            check_media_size(blob)
-            info = MediaInfo(f"image/{extension}", blob.__sizeof__())
             if extension in MediaConverter.image_formats:
-                info = MediaInfo(f"image/{extension}", blob.__sizeof__())
+                info = MediaInfo(f"image/{extension}", len(blob))
                 return await ImageInterface.from_blob(url, blob, info)
             else:
-                info = MediaInfo(f"video/{extension}", blob.__sizeof__())
-                return await VideoInterface.from_blob(url, blob, info)
+                info = MediaInfo(f"video/{extension}", len(blob))
+                return await VideoInterface.from_blob(url, blob, info, user_id=ctx.author.id)
         except ValueError:
             pass
 
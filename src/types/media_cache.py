@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import hashlib
+import os
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any
+
+import aiofiles
+import aiofiles.os
+
+import config
+from src.logging import book
+from src.util.stats import hit_rate
+
+
+def hash_bytes(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def result_key(source_hash: str, history: list[tuple[str, dict[str, Any]]]) -> str:
+    """The cache key for the result of applying `history`, in order, to the media hashed as `source_hash`."""
+    return hash_bytes(f"{source_hash}:{history!r}".encode())
+
+
+class MediaResultCache:
+    def __init__(self, directory: str | None, *, max_bytes: int) -> None:
+        """
+        Results of media edits, stored on disk and evicted least recently used first.
+
+        The index of what is stored is kept in memory, and rebuilt from the
+        directory on first use. Nothing is cached if `directory` is None.
+
+        Args:
+        ----
+            directory (str | None): Where to store results.
+            max_bytes (int): The most the stored results may take up in total.
+
+        """
+        self.directory = Path(directory) if directory is not None else None
+        self.max_bytes = max_bytes
+
+        # key: size in bytes, least recently used first
+        self.index: OrderedDict[str, int] = OrderedDict()
+        self.total = 0
+        self.hits = 0
+        self.misses = 0
+
+        self._loaded = False
+        self._lock = asyncio.Lock()
+
+    async def _load_index(self) -> None:
+        if self._loaded:
+            return
+        async with self._lock:
+            if self._loaded:
+                return
+            for key, size in await asyncio.to_thread(self._scan):
+                self.index[key] = size
+                self.total += size
+            self._loaded = True
+            book.info(f"Media cache has {len(self.index)} results [{self.total} bytes]")
+
+    def _scan(self) -> list[tuple[str, int]]:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        files = [
+            (path, path.stat())
+            for path in self.directory.iterdir()
+            if path.is_file() and path.suffix != ".tmp"
+        ]
+        files.sort(key=lambda f: f[1].st_mtime)
+        return [(path.name, stat.st_size) for path, stat in files]
+
+    async def get(self, key: str) -> bytes | None:
+        if self.directory is None:
+            return None
+        await self._load_index()
+        if key not in self.index:
+            self.misses += 1
+            return None
+
+        path = self.directory / key
+        try:
+            async with aiofiles.open(path, "rb") as file:
+                data = await file.read()
+            # so that the order survives rebuilding the index
+            await asyncio.to_thread(os.utime, path)
+        except OSError:
+            self.total -= self.index.pop(key, 0)
+            self.misses += 1
+            return None
+
+        self.index.move_to_end(key)
+        self.hits += 1
+        return data
+
+    async def set(self, key: str, data: bytes) -> None:
+        if self.directory is None or len(data) > self.max_bytes:
+            return
+        await self._load_index()
+
+        path = self.directory / key
+        temp = path.with_suffix(".tmp")
+        try:
+            async with aiofiles.open(temp, "wb") as file:
+                await file.write(data)
+            await aiofiles.os.replace(temp, path)
+        except OSError as err:
+            book.warning(f"Could not store media result {key}: {err}")
+            return
+
+        self.total -= self.index.pop(key, 0)
+        self.index[key] = len(data)
+        self.total += len(data)
+
+        while self.total > self.max_bytes:
+            old, size = self.index.popitem(last=False)
+            self.total -= size
+            with contextlib.suppress(OSError):
+                await aiofiles.os.remove(self.directory / old)
+
+    def stats(self) -> dict[str, str]:
+        return {
+            "Results": str(len(self.index)),
+            "Size": f"{self.total / 2**20:.1f}/{self.max_bytes / 2**20:.0f} MiB",
+            "Hit Rate": hit_rate(self.hits, self.misses),
+        }
+
+
+result_cache = MediaResultCache(config.media_cache_dir, max_bytes=config.media_cache_size)
@@ -1,10 +1,23 @@
 from __future__ import annotations
 
+import asyncio
+import hashlib
+import re
+import time
 from dataclasses import dataclass
+from typing import TYPE_CHECKING, Awaitable, Callable
 
 import aiohttp
 
+import config
 from config import piston_api_url
+from src.logging import book
+from src.types.resilience import ServiceUnavailableError
+from src.types.scheduler import FairScheduler, Job
+from src.util.cache import LRUCache
+
+if TYPE_CHECKING:
+    from src.types.core import VanirSession
 
 
 @dataclass
@@ -58,25 +71,30 @@ class PistonPackage:
 
 
 class PistonORM:
-    def __init__(self, session: aiohttp.ClientSession) -> None:
+    def __init__(self, session: VanirSession) -> None:
         self.session = session
 
     async def check_running(self) -> bool:
         """Check if the piston api is running."""
         try:
-            response = await self.session.get(piston_api_url + "/check")
-            response.raise_for_status()
-        except aiohttp.ClientResponseError:
+            response = await self.session.fetch(
+                "GET",
+                piston_api_url + "/check",
+                service="piston",
+            )
+        except (aiohttp.ClientError, asyncio.TimeoutError, ServiceUnavailableError):
             return False
-        else:
-            return True
+        # only the status matters, the body differs between Piston versions
+        return response.ok
 
     async def runtimes(self) -> list[PistonRuntime]:
         """Get all available runtimes that are currently installed."""
-        response = await self.session.get(piston_api_url + "/runtimes")
+        response = await self.session.cached_fetch(
+            piston_api_url + "/runtimes",
+            service="piston",
+        )
         response.raise_for_status()
-        json = await response.json()
-        return [PistonRuntime(**runtime) for runtime in json]
+        return [PistonRuntime(**runtime) for runtime in response.json()]
 
     async def execute(
         self,
@@ -107,10 +125,12 @@ class PistonORM:
             "compile_memory_limit": compile_memory_limit,
             "run_memory_limit": run_memory_limit,
         }
-        response = await self.session.post(piston_api_url + "/execute", json=json)
-        response.raise_for_status()
-
-        json = await response.json()
+        json = await self.session.fetch_json(
+            "POST",
+            piston_api_url + "/execute",
+            service="piston",
+            json=json,
+        )
         return PistonExecutionResponse(
             language=json["language"],
             version=json["version"],
@@ -119,19 +139,29 @@ class PistonORM:
 
     async def packages(self) -> list[PistonPackage]:
         """Get all available packages."""
-        response = await self.session.get(piston_api_url + "/packages")
+        response = await self.session.cached_fetch(
+            piston_api_url + "/packages",
+            service="piston",
+        )
         response.raise_for_status()
-        json = await response.json()
-        return [PistonPackage(**package) for package in json]
+        return [PistonPackage(**package) for package in response.json()]
+
+    def invalidate(self) -> None:
+        """Forget the cached runtime and package lists, after they have changed."""
+        self.session.cache.invalidate(
+            piston_api_url + "/runtimes",
+            piston_api_url + "/packages",
+        )
 
     async def install_package(self, package: PistonPackage) -> PistonPackage:
-        response = await self.session.post(
+        """Install `package`. Callers should refresh `piston_catalog` afterwards."""
+        json = await self.session.fetch_json(
+            "POST",
             piston_api_url + "/packages",
+            service="piston-install",
             json={"language": package.language, "version": package.language_version},
-            timeout=aiohttp.ClientTimeout(total=60 * 10),
         )
-        response.raise_for_status()
-        json = await response.json()
+        self.invalidate()
         return PistonPackage(
             language=json["language"],
             language_version=json["version"],
@@ -139,10 +169,221 @@ class PistonORM:
         )
 
     async def uninstall_package(self, package: PistonPackage) -> PistonPackage:
-        response = await self.session.delete(
+        """Uninstall `package`. Callers should refresh `piston_catalog` afterwards."""
+        json = await self.session.fetch_json(
+            "DELETE",
             piston_api_url + "/packages",
+            service="piston-install",
             json={"language": package.language, "version": package.language_version},
         )
-        response.raise_for_status()
-        json = await response.json()
+        self.invalidate()
         return PistonPackage(**json, installed=False)
+
+
+def parse_version(version: str) -> tuple[int, ...]:
+    """A sort key for a version string, eg. "3.10.0" -> (3, 10, 0)."""
+    return tuple(int(part) for part in re.findall(r"\d+", version))
+
+
+class PistonRuntimeCatalog:
+    def __init__(self, *, refresh_interval: float = 60 * 10) -> None:
+        """
+        The installed runtimes, indexed by language, alias and version.
+
+        Refreshed every `refresh_interval` seconds once started, and whenever
+        `refresh` is called, eg. after installing a package.
+        """
+        self.refresh_interval = refresh_interval
+        self.orm: PistonORM | None = None
+        # called after every refresh, eg. to rebuild autocomplete
+        self.listeners: list[Callable[[], None]] = []
+
+        # sorted by language, then version
+        self.runtimes: list[PistonRuntime] = []
+        # language: its runtimes, newest first
+        self.by_language: dict[str, list[PistonRuntime]] = {}
+        # lowercase language or alias: language
+        self.names: dict[str, str] = {}
+        # (language, version or alias): runtime, the newest one for aliases
+        self.versions: dict[tuple[str, str], PistonRuntime] = {}
+        self.refreshed_at: float | None = None
+
+        self._task: asyncio.Task | None = None
+
+    def start(self, orm: PistonORM) -> None:
+        self.orm = orm
+        if self._task is None:
+            self._task = asyncio.create_task(self._refresh_loop())
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await self.refresh()
+            except (aiohttp.ClientError, asyncio.TimeoutError, ServiceUnavailableError) as err:
+                book.warning(f"Could not refresh Piston runtimes: {err}")
+            except Exception as err:  # noqa: BLE001
+                # eg. a listener failing, which must not stop later refreshes
+                book.error(f"Refreshing Piston runtimes failed: {err!r}")
+
+    async def refresh(self) -> None:
+        if self.orm is None:
+            return
+        self.rebuild(await self.orm.runtimes())
+        for listener in self.listeners:
+            listener()
+
+    def rebuild(self, runtimes: list[PistonRuntime]) -> None:
+        runtimes = sorted(runtimes, key=lambda rt: (rt.language, parse_version(rt.version)))
+        by_language: dict[str, list[PistonRuntime]] = {}
+        names: dict[str, str] = {}
+        versions: dict[tuple[str, str], PistonRuntime] = {}
+        # oldest first, so that newer runtimes win for shared aliases
+        for rt in runtimes:
+            by_language.setdefault(rt.language, []).insert(0, rt)
+            for alias in rt.aliases:
+                names[alias.lower()] = rt.language
+                versions[rt.language, alias.lower()] = rt
+        for rt in runtimes:
+            names[rt.language.lower()] = rt.language
+            versions[rt.language, rt.version] = rt
+
+        self.runtimes = runtimes
+        self.by_language = by_language
+        self.names = names
+        self.versions = versions
+        self.refreshed_at = time.time()
+
+    def language(self, name: str) -> str | None:
+        """The language called or aliased `name`, if installed."""
+        return self.names.get(name.lower())
+
+    def latest(self, language: str) -> PistonRuntime | None:
+        runtimes = self.by_language.get(language)
+        return runtimes[0] if runtimes else None
+
+    def runtime(self, language: str, version: str | None = None) -> PistonRuntime | None:
+        """The runtime for `language` at `version`, or the newest one if it is None or "latest"."""
+        if version in (None, "latest"):
+            return self.latest(language)
+        return self.versions.get((language, version.strip("v`").lower()))
+
+
+def execution_key(
+    package: PistonPackage,
+    files: list[PistonExecutable],
+    stdin: str = "",
+    args: list[str] | None = None,
+) -> str:
+    """The cache key for running `files` with `package`, see `ExecutionCache`."""
+    code = hashlib.sha256()
+    for file in files:
+        code.update(f"{file.name}\0{file.encoding}\0{file.content}\0".encode())
+    return repr((package.language, package.language_version, code.hexdigest(), stdin, args or []))
+
+
+class ExecutionCache(LRUCache[str, PistonExecutionResponse]):
+    """Results of deterministic executions, so that running the same code again is free."""
+
+    def set(self, key: str, value: PistonExecutionResponse) -> None:
+        if value.run.signal is not None:
+            # killed, eg. for running out of time, which may not happen next time
+            return
+        if " at 0x" in value.run.output:
+            # a default repr, eg. of a generator, whose address differs every run
+            return
+        super().set(key, value)
+
+
+@dataclass(eq=False)
+class PistonJob(Job[PistonExecutionResponse]):
+    func: Callable[[], Awaitable[PistonExecutionResponse]]
+    cache_key: str | None = None
+    cached: bool = False
+
+
+class PistonScheduler(FairScheduler[PistonJob, PistonExecutionResponse]):
+    noun = "executions"
+
+    def __init__(
+        self,
+        *,
+        concurrency: int = 4,
+        user_concurrency: int = 1,
+        user_limit: int = 3,
+        cache: ExecutionCache | None = None,
+    ) -> None:
+        """
+        Runs executions against Piston, at most `concurrency` at once, see `FairScheduler`.
+
+        Taking executions from each user in turn means one user spamming `exec`
+        cannot make everybody else's code time out.
+
+        Args:
+        ----
+            concurrency (int): Executions running at once.
+            user_concurrency (int): Executions running at once for a single user.
+            user_limit (int): Executions a single user may have queued or running.
+            cache (ExecutionCache | None): Where to look up and store results of jobs with a cache key.
+
+        """
+        super().__init__(
+            concurrency=concurrency,
+            user_concurrency=user_concurrency,
+            user_limit=user_limit,
+        )
+        self.cache = cache
+
+    def submit(
+        self,
+        func: Callable[[], Awaitable[PistonExecutionResponse]],
+        *,
+        user_id: int,
+        cache_key: str | None = None,
+    ) -> PistonJob:
+        """
+        Queue an execution, without waiting for it. Raises ValueError if the user has too many.
+
+        Jobs with a `cache_key` are only executed if there is no cached result for it,
+        otherwise they are returned already done.
+        """
+        if cache_key is not None and self.cache is not None:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                job = PistonJob(user_id, func, cache_key=cache_key, cached=True)
+                job.started_at = job.finished_at = job.queued_at
+                job.future.set_result(cached)
+                return job
+
+        return self.enqueue(PistonJob(user_id, func, cache_key=cache_key))
+
+    async def run(
+        self,
+        func: Callable[[], Awaitable[PistonExecutionResponse]],
+        *,
+        user_id: int,
+    ) -> PistonExecutionResponse:
+        return await self.wait_for(self.submit(func, user_id=user_id))
+
+    async def _run(self, job: PistonJob) -> PistonExecutionResponse:
+        result = await job.func()
+        if job.cache_key is not None and self.cache is not None:
+            self.cache.set(job.cache_key, result)
+        return result
+
+    def stats(self) -> dict[str, str]:
+        stats = super().stats()
+        if self.cache is not None:
+            for name, value in self.cache.stats().items():
+                stats[f"Cache {name}"] = value
+        return stats
+
+
+piston_catalog = PistonRuntimeCatalog(refresh_interval=config.piston_catalog_refresh)
+
+piston_scheduler = PistonScheduler(
+    concurrency=config.piston_concurrency,
+    user_concurrency=config.piston_user_concurrency,
+    user_limit=config.piston_user_limit,
+    cache=ExecutionCache(config.piston_cache_size, ttl=config.piston_cache_ttl),
+)
@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import contextlib
+import time
+from typing import TYPE_CHECKING, Any, AsyncIterator
+
+import asyncpg
+
+import config
+from src.logging import book
+from src.util.stats import LatencyStats
+
+if TYPE_CHECKING:
+    from asyncpg.connection import LoggedQuery
+
+
+class PoolMetrics:
+    def __init__(self) -> None:
+        self.acquire = LatencyStats()
+        self.query = LatencyStats()
+        self.waiting = 0
+        self.errors = 0
+
+    def record_query(self, query: LoggedQuery) -> None:
+        self.query.record(query.elapsed)
+        if query.exception is not None:
+            self.errors += 1
+
+
+class InstrumentedPool:
+    def __init__(self, pool: asyncpg.Pool, metrics: PoolMetrics) -> None:
+        """
+        Wraps an `asyncpg.Pool` to time connection acquires.
+
+        Query latency is recorded by a query logger on each connection (see `create_pool`).
+        Anything not defined here is passed through to the underlying pool.
+        """
+        self.pool = pool
+        self.metrics = metrics
+
+    @contextlib.asynccontextmanager
+    async def acquire(self, *, timeout: float | None = None) -> AsyncIterator[asyncpg.Connection]:
+        self.metrics.waiting += 1
+        start = time.perf_counter()
+        try:
+            conn = await self.pool.acquire(timeout=timeout)
+        finally:
+            self.metrics.waiting -= 1
+        self.metrics.acquire.record(time.perf_counter() - start)
+
+        try:
+            yield conn
+        finally:
+            await self.pool.release(conn)
+
+    async def execute(self, query: str, *args: Any, timeout: float | None = None) -> str:
+        async with self.acquire() as conn:
+            return await conn.execute(query, *args, timeout=timeout)
+
+    async def fetch(self, query: str, *args: Any, timeout: float | None = None) -> list[asyncpg.Record]:
+        async with self.acquire() as conn:
+            return await conn.fetch(query, *args, timeout=timeout)
+
+    async def fetchrow(self, query: str, *args: Any, timeout: float | None = None) -> asyncpg.Record | None:
+        async with self.acquire() as conn:
+            return await conn.fetchrow(query, *args, timeout=timeout)
+
+    async def fetchval(self, query: str, *args: Any, column: int = 0, timeout: float | None = None) -> Any:
+        async with self.acquire() as conn:
+            return await conn.fetchval(query, *args, column=column, timeout=timeout)
+
+    @property
+    def in_use(self) -> int:
+        return self.pool.get_size() - self.pool.get_idle_size()
+
+    def stats(self) -> dict[str, str]:
+        return {
+            "Connections": f"{self.in_use} in use / {self.pool.get_size()} open "
+            f"[{self.pool.get_min_size()}-{self.pool.get_max_size()}]",
+            "Waiting": str(self.metrics.waiting),
+            "Acquire": str(self.metrics.acquire),
+            "Query": str(self.metrics.query),
+            "Errors": str(self.metrics.errors),
+        }
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.pool, name)
+
+
+async def create_pool(**connect_kwargs: Any) -> InstrumentedPool:
+    """Create the bot's connection pool, sized and configured from `config`."""
+    metrics = PoolMetrics()
+
+    async def init(conn: asyncpg.Connection) -> None:
+        # our queries are small and frequent, JIT compilation only adds latency
+        await conn.execute("SET jit = off")
+        conn.add_query_logger(metrics.record_query)
+
+    pool = await asyncpg.create_pool(
+        **connect_kwargs,
+        min_size=config.psql_pool_min_size,
+        max_size=config.psql_pool_max_size,
+        max_inactive_connection_lifetime=config.psql_max_inactive_connection_lifetime,
+        command_timeout=config.psql_command_timeout,
+        statement_cache_size=config.psql_statement_cache_size,
+        server_settings={"application_name": "vanir"},
+        init=init,
+    )
+    book.info(
+        f"Database pool ready [{config.psql_pool_min_size}-{config.psql_pool_max_size} connections]",
+    )
+    return InstrumentedPool(pool, metrics)
@@ -0,0 +1,266 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import random
+import time
+from dataclasses import dataclass
+from typing import AsyncIterator, Awaitable, Callable, TypeVar
+
+import aiohttp
+
+from src.logging import book
+
+T = TypeVar("T")
+
+# errors which mean the service did not handle the request, rather than rejected it
+TRANSIENT_ERRORS: tuple[type[BaseException], ...] = (
+    aiohttp.ClientConnectionError,
+    aiohttp.ClientPayloadError,
+    asyncio.TimeoutError,
+)
+
+
+class ServiceUnavailableError(Exception):
+    """A request was not made because the service is failing or overloaded."""
+
+    def __init__(self, service: str, reason: str) -> None:
+        self.service = service
+        super().__init__(f"{service} is unavailable: {reason}")
+
+
+class CircuitOpenError(ServiceUnavailableError):
+    def __init__(self, service: str, retry_after: float) -> None:
+        self.retry_after = retry_after
+        super().__init__(
+            service,
+            f"it has been failing, try again in {max(retry_after, 1):.0f}s",
+        )
+
+
+class ServiceBusyError(ServiceUnavailableError):
+    def __init__(self, service: str) -> None:
+        super().__init__(service, "too many requests are waiting on it, try again later")
+
+
+@dataclass(frozen=True)
+class ServicePolicy:
+    # requests running at once, and queued behind those, before failing fast
+    concurrency: int = 10
+    max_waiting: int = 50
+    # consecutive failures before the circuit opens, and how long it stays open
+    failure_threshold: int = 5
+    reset_timeout: float = 30
+    # retries for idempotent calls, with full jitter backoff
+    retries: int = 2
+    backoff: float = 0.25
+    backoff_max: float = 4
+    # a limit on each attempt, for services without a client-side timeout
+    timeout: float | None = None
+
+
+SERVICE_POLICIES: dict[str, ServicePolicy] = {
+    "deepl": ServicePolicy(concurrency=5),
+    "dictionary": ServicePolicy(concurrency=10),
+    "waifu": ServicePolicy(concurrency=5),
+    "piston": ServicePolicy(concurrency=8, retries=1),
+    "piston-install": ServicePolicy(concurrency=1, max_waiting=5, failure_threshold=3, retries=0),
+    "lavalink": ServicePolicy(concurrency=10, timeout=10),
+}
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, *, failure_threshold: int, reset_timeout: float) -> None:
+        """
+        Stops requests to a service after `failure_threshold` consecutive failures.
+
+        After `reset_timeout` seconds, a single request is let through:
+        if it succeeds the circuit closes again, otherwise it stays open.
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+        self.state = "closed"
+        self.failures = 0
+        self.trips = 0
+        self.opened_at = 0.0
+        self.probing = False
+
+    def check(self, *, probe: bool = True) -> None:
+        """
+        Raise `CircuitOpenError` if a request may not be made right now.
+
+        If the request would be the half-open probe, it is claimed as such,
+        unless `probe` is False, eg. to fail fast before waiting for a slot.
+        """
+        if self.state == "open":
+            retry_after = self.opened_at + self.reset_timeout - time.monotonic()
+            if retry_after > 0:
+                raise CircuitOpenError(self.name, retry_after)
+            if not probe:
+                return
+            self.state = "half-open"
+
+        if self.state == "half-open":
+            if self.probing:
+                raise CircuitOpenError(self.name, self.reset_timeout)
+            if probe:
+                self.probing = True
+
+    def success(self) -> None:
+        if self.state != "closed":
+            book.info(f"Circuit for {self.name} closed")
+        self.state = "closed"
+        self.failures = 0
+        self.probing = False
+
+    def failure(self) -> None:
+        self.failures += 1
+        self.probing = False
+        if self.state == "half-open" or (
+            self.state == "closed" and self.failures >= self.failure_threshold
+        ):
+            self.state = "open"
+            self.trips += 1
+            self.opened_at = time.monotonic()
+            book.warning(
+                f"Circuit for {self.name} opened after {self.failures} failures, "
+                f"retrying in {self.reset_timeout}s",
+            )
+
+    def release(self) -> None:
+        """Give up a half-open probe without judging the service, eg. when cancelled."""
+        self.probing = False
+
+    def __str__(self) -> str:
+        if self.state == "open":
+            retry_after = self.opened_at + self.reset_timeout - time.monotonic()
+            return f"open [{max(retry_after, 0):.0f}s]"
+        if self.failures:
+            return f"{self.state} [{self.failures} failures]"
+        return self.state
+
+
+class ServiceGuard:
+    def __init__(self, name: str, policy: ServicePolicy) -> None:
+        """A circuit breaker, bulkhead and retry policy for one service."""
+        self.name = name
+        self.policy = policy
+        self.breaker = CircuitBreaker(
+            name,
+            failure_threshold=policy.failure_threshold,
+            reset_timeout=policy.reset_timeout,
+        )
+        self.semaphore = asyncio.Semaphore(policy.concurrency)
+        self.waiting = 0
+        self.running = 0
+        self.retried = 0
+        self.rejected = 0
+
+    @contextlib.asynccontextmanager
+    async def bulkhead(self) -> AsyncIterator[None]:
+        if self.semaphore.locked() and self.waiting >= self.policy.max_waiting:
+            self.rejected += 1
+            raise ServiceBusyError(self.name)
+
+        self.waiting += 1
+        try:
+            await self.semaphore.acquire()
+        finally:
+            self.waiting -= 1
+
+        self.running += 1
+        try:
+            yield
+        finally:
+            self.running -= 1
+            self.semaphore.release()
+
+    async def _attempt(
+        self,
+        func: Callable[[], Awaitable[T]],
+        errors: tuple[type[BaseException], ...],
+        failed: Callable[[T], bool] | None,
+    ) -> tuple[T, bool]:
+        # before waiting for a slot, so that callers of a service which is down fail fast
+        self.breaker.check(probe=False)
+        async with self.bulkhead():
+            # again, as the circuit may have opened, or its probe been taken, while waiting
+            self.breaker.check()
+            try:
+                async with asyncio.timeout(self.policy.timeout):
+                    result = await func()
+            except errors:
+                self.breaker.failure()
+                raise
+            except BaseException:
+                # the service answered, or we gave up on it; neither says it is down
+                self.breaker.release()
+                raise
+
+        if failed is not None and failed(result):
+            self.breaker.failure()
+            return result, False
+        self.breaker.success()
+        return result, True
+
+    async def call(
+        self,
+        func: Callable[[], Awaitable[T]],
+        *,
+        idempotent: bool = False,
+        errors: tuple[type[BaseException], ...] = TRANSIENT_ERRORS,
+        failed: Callable[[T], bool] | None = None,
+    ) -> T:
+        """
+        Call `func` under this service's policy.
+
+        Raising one of `errors`, or returning a result for which `failed` is true,
+        counts against the circuit breaker. Idempotent calls are retried after either.
+        Once out of retries, the last error is raised or the last result returned.
+        """
+        attempts = self.policy.retries + 1 if idempotent else 1
+        for attempt in range(attempts):
+            last = attempt == attempts - 1
+            try:
+                result, ok = await self._attempt(func, errors, failed)
+            except errors:
+                if last:
+                    raise
+            else:
+                if ok or last:
+                    return result
+
+            self.retried += 1
+            await asyncio.sleep(
+                random.uniform(0, min(self.policy.backoff_max, self.policy.backoff * 2**attempt)),
+            )
+        return None  # unreachable, the last attempt always returns or raises
+
+    def __str__(self) -> str:
+        stats = f"{self.breaker} | {self.running}/{self.policy.concurrency} running"
+        if self.waiting:
+            stats += f", {self.waiting} waiting"
+        if self.retried or self.rejected or self.breaker.trips:
+            stats += (
+                f" | {self.retried} retried, {self.rejected} rejected, {self.breaker.trips} trips"
+            )
+        return stats
+
+
+# service name: guard, created on first use
+GUARDS: dict[str, ServiceGuard] = {}
+
+
+def guard(service: str) -> ServiceGuard | None:
+    """Get the guard for `service`, or None if it has no policy (eg. arbitrary URLs)."""
+    if service not in GUARDS:
+        if (policy := SERVICE_POLICIES.get(service)) is None:
+            return None
+        GUARDS[service] = ServiceGuard(service, policy)
+    return GUARDS[service]
+
+
+def guard_stats() -> dict[str, str]:
+    return {name: str(guard(name)) for name in SERVICE_POLICIES}
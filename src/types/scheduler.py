@@ -0,0 +1,188 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from dataclasses import KW_ONLY, dataclass, field
+from typing import Generic, TypeVar
+
+from src.util.stats import LatencyStats
+
+ResultT = TypeVar("ResultT")
+JobT = TypeVar("JobT", bound="Job")
+
+
+@dataclass(eq=False)
+class Job(Generic[ResultT]):
+    user_id: int
+    _: KW_ONLY
+    queued_at: float = field(default_factory=time.perf_counter)
+    started_at: float | None = None
+    finished_at: float | None = None
+    future: asyncio.Future[ResultT] = field(
+        default_factory=lambda: asyncio.get_running_loop().create_future(),
+    )
+    task: asyncio.Task | None = None
+
+    @property
+    def wait_time(self) -> float:
+        """Seconds spent queued."""
+        return (self.started_at or time.perf_counter()) - self.queued_at
+
+    @property
+    def run_time(self) -> float:
+        """Seconds spent running, not counting the time queued."""
+        if self.started_at is None:
+            return 0
+        return (self.finished_at or time.perf_counter()) - self.started_at
+
+
+class FairScheduler(ABC, Generic[JobT, ResultT]):
+    # what jobs are called in the message for a user at their limit
+    noun = "jobs"
+
+    def __init__(
+        self,
+        *,
+        concurrency: int,
+        user_concurrency: int | None = None,
+        user_limit: int = 3,
+    ) -> None:
+        """
+        Runs jobs, at most `concurrency` at once.
+
+        Queued jobs are taken from each user in turn, so one user queueing many
+        does not hold up everybody else. Subclasses create jobs and define `_run`.
+
+        Args:
+        ----
+            concurrency (int): Jobs running at once.
+            user_concurrency (int | None): Jobs running at once for a single user, None for no limit.
+            user_limit (int): Jobs a single user may have queued or running.
+
+        """
+        self.concurrency = concurrency
+        self.user_concurrency = user_concurrency
+        self.user_limit = user_limit
+
+        # user id: their queued jobs, in the order users get their next turn
+        self.queues: OrderedDict[int, deque[JobT]] = OrderedDict()
+        self.running: set[JobT] = set()
+
+        self.wait = LatencyStats()
+        self.run_time = LatencyStats()
+        self.failed = 0
+
+    @property
+    def depth(self) -> int:
+        return sum(len(queue) for queue in self.queues.values())
+
+    def _running_for(self, user_id: int) -> int:
+        return sum(job.user_id == user_id for job in self.running)
+
+    def position(self, job: JobT) -> int | None:
+        """About how many jobs will start before `job`, or None if it is not queued."""
+        queue = self.queues.get(job.user_id)
+        if queue is None or job not in queue:
+            return None
+        # each turn takes one job from every user with any left, in order
+        turn = queue.index(job)
+        order = list(self.queues)
+        mine = order.index(job.user_id)
+        return sum(
+            min(len(self.queues[user_id]), turn + (i < mine)) for i, user_id in enumerate(order)
+        )
+
+    def enqueue(self, job: JobT) -> JobT:
+        """Queue `job`, without waiting for it. Raises ValueError if its user has too many."""
+        queued = len(self.queues.get(job.user_id, ()))
+        active = self._running_for(job.user_id)
+        if queued + active >= self.user_limit:
+            msg = f"You already have {queued + active} {self.noun} in progress, wait for them to finish"
+            raise ValueError(msg)
+
+        self.queues.setdefault(job.user_id, deque()).append(job)
+        self._dispatch()
+        return job
+
+    async def wait_for(self, job: JobT) -> ResultT:
+        """Wait for `job` to finish. Cancelling this cancels the job."""
+        try:
+            return await asyncio.shield(job.future)
+        except asyncio.CancelledError:
+            self.cancel(job)
+            raise
+
+    def cancel(self, job: JobT) -> None:
+        """Remove `job` from the queue, or cancel it if it is already running."""
+        queue = self.queues.get(job.user_id)
+        if queue is not None and job in queue:
+            queue.remove(job)
+            if not queue:
+                del self.queues[job.user_id]
+            job.future.cancel()
+        elif job.task is not None:
+            job.task.cancel()
+            if job.started_at is None:
+                # the task never starts, so `_execute` will not give up its slot
+                self.running.discard(job)
+                job.future.cancel()
+                self._dispatch()
+
+    def _dispatch(self) -> None:
+        while len(self.running) < self.concurrency:
+            # the first user in line who is not already at their limit
+            user_id = next(
+                (
+                    user_id
+                    for user_id in self.queues
+                    if self.user_concurrency is None
+                    or self._running_for(user_id) < self.user_concurrency
+                ),
+                None,
+            )
+            if user_id is None:
+                return
+
+            queue = self.queues.pop(user_id)
+            job = queue.popleft()
+            if queue:
+                # back of the line for their next job
+                self.queues[user_id] = queue
+
+            self.running.add(job)
+            job.task = asyncio.create_task(self._execute(job))
+
+    async def _execute(self, job: JobT) -> None:
+        job.started_at = time.perf_counter()
+        self.wait.record(job.wait_time)
+        try:
+            result = await self._run(job)
+        except asyncio.CancelledError:
+            job.future.cancel()
+        except Exception as err:  # noqa: BLE001
+            self.failed += 1
+            if not job.future.done():
+                job.future.set_exception(err)
+        else:
+            if not job.future.done():
+                job.future.set_result(result)
+        finally:
+            job.finished_at = time.perf_counter()
+            self.run_time.record(job.run_time)
+            self.running.discard(job)
+            self._dispatch()
+
+    @abstractmethod
+    async def _run(self, job: JobT) -> ResultT:
+        """Do the work of `job`, returning its result."""
+
+    def stats(self) -> dict[str, str]:
+        return {
+            "Running": f"{len(self.running)}/{self.concurrency}",
+            "Queued": f"{self.depth} [{len(self.queues)} users]",
+            "Wait": str(self.wait),
+            "Run": str(self.run_time),
+            "Failed": str(self.failed),
+        }
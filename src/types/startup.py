@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable
+
+from src.logging import book
+
+
+@dataclass
+class StartupStep:
+    name: str
+    # seconds since the timeline started
+    start: float
+    end: float | None = None
+    error: BaseException | None = None
+    background: bool = False
+    attempts: int = 0
+
+    @property
+    def elapsed(self) -> float | None:
+        return None if self.end is None else self.end - self.start
+
+    def __str__(self) -> str:
+        span = f"{self.start:7.3f}s -> " + (
+            "running" if self.end is None else f"{self.end:7.3f}s [{self.elapsed*1000:.0f}ms]"
+        )
+        flags = []
+        if self.background:
+            flags.append("background")
+        if self.attempts > 1:
+            flags.append(f"{self.attempts} attempts")
+        if self.error is not None:
+            flags.append(f"failed: {self.error.__class__.__name__}: {self.error}")
+        return f"{self.name:<12} {span}" + (f" ({', '.join(flags)})" if flags else "")
+
+
+class StartupTimeline:
+    def __init__(self) -> None:
+        """Runs and times the steps of bot startup."""
+        self.origin = time.perf_counter()
+        self.steps: list[StartupStep] = []
+        self.tasks: list[asyncio.Task] = []
+
+    def now(self) -> float:
+        return time.perf_counter() - self.origin
+
+    async def run(
+        self,
+        name: str,
+        func: Callable[[], Awaitable[Any]],
+        *,
+        timeout: float,
+        required: bool = True,
+    ) -> Any:
+        """
+        Run a startup step, giving up after `timeout` seconds.
+
+        If the step fails and is `required`, the error is raised; otherwise it is logged
+        and None is returned.
+        """
+        step = StartupStep(name, start=self.now(), attempts=1)
+        self.steps.append(step)
+        try:
+            return await asyncio.wait_for(func(), timeout=timeout)
+        except Exception as err:
+            step.error = err
+            if required:
+                book.critical(f"Startup step {name} failed: {err!r}")
+                raise
+            book.warning(f"Startup step {name} failed: {err!r}")
+            return None
+        finally:
+            step.end = self.now()
+
+    def background(
+        self,
+        name: str,
+        func: Callable[[], Awaitable[Any]],
+        *,
+        timeout: float,
+        retries: int = 5,
+        delay: float = 5,
+    ) -> asyncio.Task:
+        """
+        Run a startup step without waiting for it, retrying with exponential backoff.
+
+        For optional services which the bot can start without, eg. Piston or Lavalink.
+        """
+        step = StartupStep(name, start=self.now(), background=True)
+        self.steps.append(step)
+
+        async def inner() -> Any:
+            try:
+                for attempt in range(retries + 1):
+                    step.attempts += 1
+                    try:
+                        result = await asyncio.wait_for(func(), timeout=timeout)
+                    except Exception as err:  # noqa: BLE001
+                        step.error = err
+                        if attempt == retries:
+                            book.warning(
+                                f"Startup step {name} failed after {step.attempts} attempts: {err!r}",
+                            )
+                            return None
+                        wait = delay * 2**attempt
+                        book.info(f"Startup step {name} failed ({err!r}), retrying in {wait}s")
+                        await asyncio.sleep(wait)
+                    else:
+                        step.error = None
+                        return result
+                return None
+            finally:
+                step.end = self.now()
+                book.info(f"Startup step {name} finished in background: {step}")
+
+        task = asyncio.create_task(inner())
+        self.tasks.append(task)
+        return task
+
+    def report(self) -> str:
+        return "\n".join(str(step) for step in sorted(self.steps, key=lambda s: s.start))
@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import bisect
+from typing import Callable, Generic, Iterable, TypeVar
+
+from rapidfuzz import fuzz, process
+
+from src.util.cache import LRUCache
+
+ChoiceT = TypeVar("ChoiceT")
+
+# discord only displays 25 choices per autocomplete response
+MAX_CHOICES = 25
+
+
+class AutocompleteIndex(Generic[ChoiceT]):
+    def __init__(
+        self,
+        candidates: Iterable[ChoiceT] = (),
+        *,
+        key: Callable[[ChoiceT], str] = lambda c: str(c),
+        limit: int = MAX_CHOICES,
+        threshold: int = 0,
+        cache_size: int = 512,
+        scorer: Callable[..., float] = fuzz.partial_token_set_ratio,
+    ) -> None:
+        """
+        A prebuilt candidate table for answering autocomplete queries.
+
+        Args:
+        ----
+            candidates (Iterable[ChoiceT]): The values to search through.
+            key (Callable[[ChoiceT], str]): Gets the searchable text of a candidate.
+            limit (int): The default number of results to return. Defaults to 25.
+            threshold (int): The minimum fuzzy score [0-100] for a result to be returned.
+            cache_size (int): The number of query results to keep.
+            scorer (Callable[..., float]): The rapidfuzz scorer used for fuzzy queries.
+
+        """
+        self.key = key
+        self.limit = limit
+        self.threshold = threshold
+        self.scorer = scorer
+
+        self.candidates: list[ChoiceT] = []
+        self.keys: list[str] = []
+        self._sorted: list[tuple[str, int]] = []
+        # stored as tuples, so that callers changing their results cannot change the cache
+        self._cache: LRUCache[tuple[str, int], tuple[ChoiceT, ...]] = LRUCache(cache_size)
+
+        self.rebuild(candidates)
+
+    def rebuild(self, candidates: Iterable[ChoiceT]) -> None:
+        """Replace the candidate table and drop any cached results."""
+        self.candidates = list(candidates)
+        self.keys = [self.key(c).casefold() for c in self.candidates]
+        self._sorted = sorted((k, i) for i, k in enumerate(self.keys))
+        self._cache.clear()
+
+    def prefix(self, query: str, *, k: int | None = None) -> list[ChoiceT]:
+        """Get up to `k` candidates whose key starts with `query`, alphabetically."""
+        k = k or self.limit
+        query = query.casefold()
+        start = bisect.bisect_left(self._sorted, (query, -1))
+
+        out: list[ChoiceT] = []
+        for text, i in self._sorted[start:]:
+            if not text.startswith(query) or len(out) >= k:
+                break
+            out.append(self.candidates[i])
+        return out
+
+    def fuzzy(self, query: str, *, k: int | None = None) -> list[ChoiceT]:
+        """Get the `k` best fuzzy matches for `query`, best first."""
+        k = k or self.limit
+        matches = process.extract(
+            query.casefold(),
+            self.keys,
+            scorer=self.scorer,
+            limit=k,
+            score_cutoff=self.threshold,
+        )
+        return [self.candidates[i] for _, _, i in matches]
+
+    def search(self, query: str, *, k: int | None = None) -> list[ChoiceT]:
+        """
+        Get up to `k` results for `query`.
+
+        Prefix matches come first, and the rest is filled with fuzzy matches.
+        An empty query returns the first `k` candidates in their original order.
+        Results are cached per query until the next `rebuild`.
+        """
+        k = k or self.limit
+        query = query.strip().casefold()
+        cache_key = (query, k)
+
+        if (cached := self._cache.get(cache_key)) is not None:
+            return list(cached)
+
+        if not query:
+            result = self.candidates[:k]
+        else:
+            result = self.prefix(query, k=k)
+            if len(result) < k:
+                seen = {id(c) for c in result}
+                result.extend(
+                    c for c in self.fuzzy(query, k=k) if id(c) not in seen
+                )
+                result = result[:k]
+
+        self._cache.set(cache_key, tuple(result))
+        return result
+
+    def __len__(self) -> int:
+        return len(self.candidates)
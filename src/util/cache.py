@@ -1,8 +1,15 @@
+import asyncio
+import time
+from collections import OrderedDict
 from datetime import UTC, datetime, timedelta
 from functools import lru_cache, wraps
-from typing import Any, Callable, TypeVar
+from typing import Any, Awaitable, Callable, Generic, Hashable, TypeVar
+
+from src.util.stats import hit_rate
 
 RetT = TypeVar("RetT")
+KeyT = TypeVar("KeyT", bound=Hashable)
+ValueT = TypeVar("ValueT")
 FuncT = Callable[..., RetT]
 
 
@@ -26,3 +33,98 @@ def timed_lru_cache(seconds: int, maxsize: int = 128) -> Callable[[FuncT], FuncT
         return wrapped_func
 
     return wrapper_cache
+
+
+class LRUCache(Generic[KeyT, ValueT]):
+    def __init__(
+        self,
+        size: int,
+        *,
+        ttl: float | None = None,
+        weigh: Callable[[ValueT], int] | None = None,
+    ) -> None:
+        """
+        An in-memory cache which drops the least recently used entries first.
+
+        Args:
+        ----
+            size (int): The maximum number of entries, or their total weight if `weigh` is given.
+            ttl (float | None): Seconds an entry is kept for, or None to keep it until it is dropped.
+            weigh (Callable | None): The weight of a value, eg. `len` to bound the bytes kept.
+
+        """
+        self.size = size
+        self.ttl = ttl
+        self.weigh = weigh
+        # key: (expires, value), least recently used first
+        self.entries: OrderedDict[KeyT, tuple[float, ValueT]] = OrderedDict()
+        self.weight = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, key: KeyT) -> ValueT | None:
+        entry = self.entries.get(key)
+        if entry is not None and entry[0] < time.monotonic():
+            self.pop(key)
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key: KeyT, value: ValueT) -> None:
+        self.pop(key)
+        expires = time.monotonic() + self.ttl if self.ttl is not None else float("inf")
+        self.entries[key] = (expires, value)
+        self.weight += self.weigh(value) if self.weigh is not None else 1
+        while self.weight > self.size and self.entries:
+            self.pop(next(iter(self.entries)))
+
+    def pop(self, key: KeyT) -> ValueT | None:
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return None
+        self.weight -= self.weigh(entry[1]) if self.weigh is not None else 1
+        return entry[1]
+
+    def clear(self) -> None:
+        self.entries.clear()
+        self.weight = 0
+
+    def stats(self) -> dict[str, str]:
+        return {
+            "Entries": f"{len(self)}/{self.size}" if self.weigh is None else str(len(self)),
+            "Hit Rate": hit_rate(self.hits, self.misses),
+        }
+
+
+async def coalesce(
+    inflight: dict[Hashable, asyncio.Future[RetT]],
+    key: Hashable,
+    factory: Callable[[], Awaitable[RetT]],
+) -> RetT:
+    """
+    Await `factory()`, or the call for `key` already in `inflight`.
+
+    Concurrent callers with the same key share a single call, which is removed
+    from `inflight` once it finishes.
+    """
+    future = inflight.get(key)
+    if future is None:
+        future = asyncio.ensure_future(factory())
+        inflight[key] = future
+
+        def done(fut: asyncio.Future) -> None:
+            inflight.pop(key, None)
+            if not fut.cancelled():
+                fut.exception()  # mark as retrieved if every waiter left
+
+        future.add_done_callback(done)
+
+    # a waiter being cancelled must not cancel the call for everyone else
+    return await asyncio.shield(future)
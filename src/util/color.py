@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+from typing import Iterable
+
+import numpy as np
+
+from assets.color_db import COLOR_INDEX
+
+ColorLike = str | int | tuple[int, int, int]
+
+# D65 reference white
+_WHITE = np.array([0.95047, 1.0, 1.08883])
+_SRGB_TO_XYZ = np.array(
+    [
+        [0.4124564, 0.3575761, 0.1804375],
+        [0.2126729, 0.7151522, 0.0721750],
+        [0.0193339, 0.1191920, 0.9503041],
+    ],
+)
+
+
+def to_rgb(color: ColorLike) -> tuple[int, int, int]:
+    """Convert a hex string (`#rrggbb` or `rrggbb`), 24-bit integer or RGB tuple to an RGB tuple."""
+    if isinstance(color, str):
+        color = int(color.strip().lstrip("#"), 16)
+    if isinstance(color, int):
+        return (color >> 16) & 0xFF, (color >> 8) & 0xFF, color & 0xFF
+    return tuple(color)
+
+
+def rgb_to_lab(rgb: np.ndarray) -> np.ndarray:
+    """Convert an (..., 3) array of 0-255 sRGB values to CIELAB."""
+    srgb = np.asarray(rgb, dtype=np.float64) / 255
+    linear = np.where(
+        srgb <= 0.04045,
+        srgb / 12.92,
+        ((srgb + 0.055) / 1.055) ** 2.4,
+    )
+    xyz = linear @ _SRGB_TO_XYZ.T / _WHITE
+
+    epsilon = 216 / 24389
+    kappa = 24389 / 27
+    f = np.where(xyz > epsilon, np.cbrt(xyz), (kappa * xyz + 16) / 116)
+
+    lightness = 116 * f[..., 1] - 16
+    a = 500 * (f[..., 0] - f[..., 1])
+    b = 200 * (f[..., 1] - f[..., 2])
+    return np.stack((lightness, a, b), axis=-1)
+
+
+class ColorIndex:
+    def __init__(
+        self,
+        colors: dict[str, tuple[str, tuple[int, int, int]]],
+        *,
+        chunk_size: int = 4096,
+    ) -> None:
+        """
+        Nearest named color lookups by CIE76 distance (Euclidean distance in CIELAB).
+
+        Args:
+        ----
+            colors (dict[str, tuple[str, tuple[int, int, int]]]): name: (hex, rgb), as in `COLOR_INDEX`.
+            chunk_size (int): How many colors of a batch are compared at once, to bound memory use.
+
+        """
+        self.names = list(colors)
+        self.lab = rgb_to_lab(np.array([rgb for _, rgb in colors.values()]))
+        self.chunk_size = chunk_size
+
+    def _distances(self, colors: Iterable[ColorLike] | np.ndarray) -> np.ndarray:
+        if not isinstance(colors, np.ndarray):
+            colors = np.array([to_rgb(c) for c in colors])
+        lab = rgb_to_lab(colors.reshape(-1, 3))
+        # (n colors, n names)
+        return np.linalg.norm(lab[:, None, :] - self.lab[None, :, :], axis=-1)
+
+    def nearest(self, color: ColorLike) -> tuple[str, float]:
+        """Get the closest named color and its distance."""
+        return self.nearest_batch([color])[0]
+
+    def k_nearest(self, color: ColorLike, k: int = 5) -> list[tuple[str, float]]:
+        """Get the `k` closest named colors and their distances, closest first."""
+        distances = self._distances([color])[0]
+        k = min(k, len(self.names))
+        best = np.argpartition(distances, k - 1)[:k]
+        best = best[np.argsort(distances[best])]
+        return [(self.names[i], float(distances[i])) for i in best]
+
+    def nearest_batch(
+        self,
+        colors: Iterable[ColorLike] | np.ndarray,
+    ) -> list[tuple[str, float]]:
+        """
+        Get the closest named color for every color in `colors`.
+
+        `colors` may be any iterable of colors, or an (..., 3) array of RGB values
+        such as an image's pixels.
+        """
+        if not isinstance(colors, np.ndarray):
+            colors = np.array([to_rgb(c) for c in colors])
+        colors = colors.reshape(-1, 3)
+
+        out: list[tuple[str, float]] = []
+        for start in range(0, len(colors), self.chunk_size):
+            distances = self._distances(colors[start : start + self.chunk_size])
+            best = distances.argmin(axis=1)
+            out.extend(
+                (self.names[i], float(d))
+                for i, d in zip(best, distances[np.arange(len(best)), best])
+            )
+        return out
+
+
+COLOR_NAME_INDEX = ColorIndex(COLOR_INDEX)
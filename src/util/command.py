@@ -6,10 +6,16 @@ from typing import TYPE_CHECKING, Any, Union, get_args, get_origin
 from discord.app_commands import Choice
 from discord.ext import commands
 
-import config
 from src import constants
-from src.types.media import ImageInterface, MediaInfo, MediaInterface, VideoInterface
+from src.types.media import (
+    ImageInterface,
+    MediaInfo,
+    MediaInterface,
+    VideoInterface,
+    image_format,
+)
 from src.util import format
+from src.util.autocomplete import AutocompleteIndex
 from src.util.parse import find_ext
 
 if TYPE_CHECKING:
@@ -22,9 +28,6 @@ if TYPE_CHECKING:
     )
     from src.types.core import Vanir, VanirContext
 
-if config.use_system_assets:
-    from wand.image import Image
-
 
 def discover_group(group: commands.Group) -> set[commands.Command]:
     end = group.commands
@@ -94,8 +97,7 @@ def get_param_annotation(param: inspect.Parameter) -> str:
 async def get_media_info(media: MediaInterface) -> MediaInfo | None:
     blob = await media.read()
     if isinstance(media, ImageInterface):
-        img = Image(blob=blob)
-        return MediaInfo(f"image/{img.format}", img.length_of_bytes)
+        return MediaInfo(f"image/{image_format(blob)}", len(blob))
     if isinstance(media, VideoInterface):
         ext = find_ext(media.url)
         return MediaInfo(f"image/{ext}", len(blob))
@@ -173,15 +175,17 @@ def safe_default(
     return arg
 
 
+LANGCODE_INDEX = AutocompleteIndex(
+    (
+        Choice(name=f"{v} [{k}]", value=k)
+        for k, v in sorted(constants.LANGUAGE_CODE_MAP.items(), key=lambda t: t[1])
+    ),
+    key=lambda c: c.name,
+)
+
+
 async def langcode_autocomplete(
     _itx: discord.Interaction,
     current: str,
 ) -> list[Choice]:
-    options = [
-        Choice(name=f"{v} [{k}]", value=k)
-        for k, v in constants.LANGUAGE_CODE_INDEX.items()
-    ][:25]
-    return sorted(
-        filter(lambda c: current.lower() in c.name.lower(), options),
-        key=lambda c: c.name,
-    )
+    return LANGCODE_INDEX.search(current)
@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import asyncio
+import importlib
+import time
+import types
+from typing import Any
+
+from src.logging import book
+
+# module name: lazy module, for every module imported through `lazy_import`
+LAZY_MODULES: dict[str, LazyModule] = {}
+
+
+class LazyModule(types.ModuleType):
+    def __init__(self, name: str) -> None:
+        """A stand-in for a module which is only imported once one of its attributes is used."""
+        super().__init__(name)
+        self._module: types.ModuleType | None = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._module is not None
+
+    def load(self) -> types.ModuleType:
+        if self._module is None:
+            start = time.perf_counter()
+            self._module = importlib.import_module(self.__name__)
+            book.info(
+                f"Imported {self.__name__} in {(time.perf_counter() - start)*1000:.2f}ms",
+            )
+        return self._module
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.load(), name)
+
+    def __dir__(self) -> list[str]:
+        return dir(self.load())
+
+    def __repr__(self) -> str:
+        return f"<lazy module {self.__name__!r} ({'loaded' if self.loaded else 'not loaded'})>"
+
+
+def lazy_import(name: str) -> LazyModule:
+    """
+    Get a module which is imported on first attribute access.
+
+    Use in place of a module-level `import` for libraries which are slow to import
+    and only needed by a few commands. Submodules are imported by their full name,
+    eg. `plt = lazy_import("matplotlib.pyplot")`.
+    """
+    if name not in LAZY_MODULES:
+        LAZY_MODULES[name] = LazyModule(name)
+    return LAZY_MODULES[name]
+
+
+async def warm_lazy_modules() -> None:
+    """Import every lazy module which has not been used yet, one at a time, off the event loop."""
+    start = time.perf_counter()
+    pending = [m for m in LAZY_MODULES.values() if not m.loaded]
+    for module in pending:
+        try:
+            await asyncio.to_thread(module.load)
+        except ImportError as err:
+            book.warning(f"Could not import {module.__name__}: {err}")
+
+    if pending:
+        book.info(
+            f"Warmed {len(pending)} lazy modules in {time.perf_counter() - start:.2f}s",
+        )
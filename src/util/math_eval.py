@@ -0,0 +1,530 @@
+from __future__ import annotations
+
+import ast
+import asyncio
+import math
+import operator
+import time
+from multiprocessing import Pipe, Process
+from typing import TYPE_CHECKING, Any, Callable
+
+import config
+from src.constants import MATH_GLOBALS_MAP
+
+if TYPE_CHECKING:
+    from multiprocessing.connection import Connection
+
+# nodes evaluated, and elements of containers checked, per evaluation
+MAX_OPERATIONS = 100_000
+# bits in any integer, about 3000 digits
+MAX_INT_BITS = 10_000
+# elements in any container, or characters in any string, counting nested ones
+MAX_ITEMS = 10_000
+# characters printed
+MAX_OUTPUT = 10_000
+# seconds
+TIMEOUT = 0.05
+
+BINARY_OPERATORS: dict[type[ast.operator], Callable[[Any, Any], Any]] = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+    ast.Pow: operator.pow,
+    ast.LShift: operator.lshift,
+    ast.RShift: operator.rshift,
+    ast.BitOr: operator.or_,
+    ast.BitXor: operator.xor,
+    ast.BitAnd: operator.and_,
+}
+
+UNARY_OPERATORS: dict[type[ast.unaryop], Callable[[Any], Any]] = {
+    ast.UAdd: operator.pos,
+    ast.USub: operator.neg,
+    ast.Not: operator.not_,
+    ast.Invert: operator.invert,
+}
+
+COMPARISONS: dict[type[ast.cmpop], Callable[[Any, Any], bool]] = {
+    ast.Eq: operator.eq,
+    ast.NotEq: operator.ne,
+    ast.Lt: operator.lt,
+    ast.LtE: operator.le,
+    ast.Gt: operator.gt,
+    ast.GtE: operator.ge,
+    ast.In: lambda a, b: a in b,
+    ast.NotIn: lambda a, b: a not in b,
+    ast.Is: operator.is_,
+    ast.IsNot: operator.is_not,
+}
+
+# what `from math import *` brings in besides functions
+MATH_CONSTANTS = {name: getattr(math, name) for name in ("pi", "e", "tau", "inf", "nan")}
+
+
+def _factorial_bits(n: Any) -> float:
+    return n * math.log2(n) if isinstance(n, int) and n > 1 else 0
+
+
+def _perm_bits(n: Any, k: Any = None) -> float:
+    if not isinstance(n, int) or n < 2:
+        return 0
+    return (n if k is None else k) * math.log2(n)
+
+
+def _comb_bits(n: Any, k: Any) -> float:
+    if not isinstance(n, int) or not isinstance(k, int) or n < 2:
+        return 0
+    return min(k, n - k) * math.log2(n)
+
+
+def _round_bits(number: Any, ndigits: Any = None) -> float:
+    # rounding an int to tens, hundreds, ... computes 10**-ndigits first
+    if not isinstance(number, int) or not isinstance(ndigits, int) or ndigits >= 0:
+        return 0
+    return -ndigits * math.log2(10)
+
+
+# functions whose result can be far larger than their arguments: estimate of the result's size in bits
+CALL_BITS: dict[Callable[..., Any], Callable[..., float]] = {
+    math.factorial: _factorial_bits,
+    math.perm: _perm_bits,
+    math.comb: _comb_bits,
+    round: _round_bits,
+}
+
+# names in MATH_GLOBALS_MAP which stand in for operators, so that they are checked like them
+OPERATOR_FUNCTIONS: dict[str, type[ast.operator]] = {
+    "add": ast.Add,
+    "sub": ast.Sub,
+    "mul": ast.Mult,
+    "div": ast.Div,
+    "mod": ast.Mod,
+    "floordiv": ast.FloorDiv,
+    "xor": ast.BitXor,
+    "lshift": ast.LShift,
+    "rshift": ast.RShift,
+}
+
+
+# builtins whose result can differ between runs of the same code
+NONDETERMINISTIC_NAMES = frozenset(
+    {
+        "__import__",
+        "breakpoint",
+        "compile",
+        "eval",
+        "exec",
+        "globals",
+        "hash",
+        "id",
+        "input",
+        "locals",
+        "object",
+        "open",
+        "set",
+        "frozenset",
+        "vars",
+    },
+)
+
+
+def is_deterministic(code: str) -> bool:
+    """
+    Whether `code` plainly prints the same thing every time it is run.
+
+    Code which imports anything, touches dunder attributes, or may depend on
+    the order of a set, whose strings hash differently in each process, is not.
+    Nor is code defining functions or classes, whose reprs include their address.
+    """
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return False
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.Import, ast.ImportFrom, ast.Set, ast.SetComp)):
+            return False
+        if isinstance(node, (ast.Lambda, ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            return False
+        if isinstance(node, ast.Name) and node.id in NONDETERMINISTIC_NAMES:
+            return False
+        if isinstance(node, ast.Attribute) and node.attr.startswith("_"):
+            return False
+    return True
+
+
+class UnsupportedExpressionError(ValueError):
+    """The code uses something the evaluator does not allow, or would exceed its limits."""
+
+
+class MathEvaluator:
+    def __init__(self) -> None:
+        """
+        Evaluates simple Python, such as `sqrt(2)*3`, without executing it.
+
+        Only expressions, assignments to names and calls to functions in
+        `MATH_GLOBALS_MAP` are allowed. Everything is counted against the
+        limits at the top of this module, so that no code can take long or
+        use much memory. Code which is not allowed raises `UnsupportedExpressionError`,
+        other errors are raised as they would be by Python.
+        """
+        self.globals: dict[str, Any] = {**MATH_CONSTANTS, **MATH_GLOBALS_MAP}
+        # these may be called by other functions too, eg. `map(factorial, ...)`, so they check themselves
+        for name, func in list(self.globals.items()):
+            if (estimate := CALL_BITS.get(func)) is not None:
+                self.globals[name] = self._sized(func, estimate)
+        for name, op in OPERATOR_FUNCTIONS.items():
+            self.globals[name] = self._operator(op())
+        self.globals["prod"] = self._prod
+        self.globals["sum"] = self._sum
+        self.globals["print"] = self._print
+        self.callables = {id(v) for v in self.globals.values() if callable(v)}
+
+        self.locals: dict[str, Any] = {}
+        self.output: list[str] = []
+        self.output_size = 0
+        self.operations = 0
+        self.deadline = 0.0
+
+    def evaluate(self, code: str) -> str:
+        """Run `code` and return what it printed."""
+        try:
+            tree = ast.parse(code, mode="exec")
+        except SyntaxError as err:
+            raise UnsupportedExpressionError(str(err)) from None
+
+        self.locals = {}
+        self.output = []
+        self.output_size = 0
+        self.operations = 0
+        self.deadline = time.perf_counter() + TIMEOUT
+
+        for statement in tree.body:
+            self._statement(statement)
+        return "".join(self.output)
+
+    def _tick(self, count: int = 1) -> None:
+        self.operations += count
+        if self.operations > MAX_OPERATIONS:
+            msg = f"More than {MAX_OPERATIONS} operations"
+            raise UnsupportedExpressionError(msg)
+        if time.perf_counter() > self.deadline:
+            msg = f"Took longer than {TIMEOUT}s"
+            raise UnsupportedExpressionError(msg)
+
+    def _weight(self, value: Any) -> int:
+        """The number of elements in `value`, counting nested ones, up to `MAX_ITEMS` + 1."""
+        if isinstance(value, (str, bytes, range)):
+            return len(value)
+        if isinstance(value, dict):
+            value = [*value.keys(), *value.values()]
+        if not isinstance(value, (list, tuple, set, frozenset)):
+            return 1
+
+        total = len(value)
+        if total > MAX_ITEMS:
+            return total
+        for item in value:
+            self._tick()
+            total += self._weight(item) - 1
+            if total > MAX_ITEMS:
+                break
+        return total
+
+    def _checked(self, value: Any) -> Any:
+        if isinstance(value, int):
+            self._too_large(value.bit_length())
+        if self._weight(value) > MAX_ITEMS:
+            msg = f"More than {MAX_ITEMS} items"
+            raise UnsupportedExpressionError(msg)
+        return value
+
+    def _too_large(self, bits: float) -> None:
+        if bits > MAX_INT_BITS:
+            msg = f"Integer larger than {MAX_INT_BITS} bits"
+            raise UnsupportedExpressionError(msg)
+
+    def _sized(self, func: Callable[..., Any], estimate: Callable[..., float]) -> Callable[..., Any]:
+        def call(*args: Any, **kwargs: Any) -> Any:
+            self._tick()
+            self._too_large(estimate(*args, **kwargs))
+            return self._checked(func(*args, **kwargs))
+
+        return call
+
+    def _operator(self, op: ast.operator) -> Callable[[Any, Any], Any]:
+        func = BINARY_OPERATORS[type(op)]
+
+        def call(left: Any, right: Any) -> Any:
+            self._tick()
+            self._check_binop(op, left, right)
+            return self._checked(func(left, right))
+
+        return call
+
+    def _prod(self, iterable: Any, *, start: Any = 1) -> Any:
+        items = list(iterable)
+        self._tick(len(items))
+        self._too_large(
+            sum(item.bit_length() for item in (*items, start) if isinstance(item, int)),
+        )
+        return math.prod(items, start=start)
+
+    def _sum(self, iterable: Any, /, start: Any = 0) -> Any:
+        items = list(iterable)
+        self._tick(len(items))
+        if isinstance(start, (str, bytes, bytearray)):
+            msg = f"sum() can't sum {type(start).__name__}"
+            raise TypeError(msg)
+        if all(isinstance(item, (int, float, complex)) for item in (*items, start)):
+            return sum(items, start)
+
+        # eg. lists, where each addition copies everything so far
+        total = start
+        for item in items:
+            total = self._checked(total + item)
+        return total
+
+    def _print(self, *values: Any, sep: str = " ", end: str = "\n") -> None:
+        text = sep.join(str(value) for value in values) + end
+        self.output_size += len(text)
+        if self.output_size > MAX_OUTPUT:
+            msg = f"Printed more than {MAX_OUTPUT} characters"
+            raise UnsupportedExpressionError(msg)
+        self.output.append(text)
+
+    def _statement(self, node: ast.stmt) -> None:
+        self._tick()
+        if isinstance(node, ast.Expr):
+            self._eval(node.value)
+        elif isinstance(node, ast.Assign):
+            value = self._eval(node.value)
+            for target in node.targets:
+                self._assign(target, value)
+        else:
+            msg = f"{type(node).__name__} statements are not supported"
+            raise UnsupportedExpressionError(msg)
+
+    def _assign(self, target: ast.expr, value: Any) -> None:
+        if isinstance(target, ast.Name):
+            self.locals[target.id] = value
+        elif isinstance(target, (ast.Tuple, ast.List)):
+            values = list(value)
+            if len(values) != len(target.elts):
+                msg = f"expected {len(target.elts)} values to unpack, got {len(values)}"
+                raise ValueError(msg)
+            for elt, item in zip(target.elts, values):
+                self._assign(elt, item)
+        else:
+            msg = f"Cannot assign to {type(target).__name__}"
+            raise UnsupportedExpressionError(msg)
+
+    def _eval(self, node: ast.expr) -> Any:
+        self._tick()
+        method = getattr(self, f"_eval_{type(node).__name__}", None)
+        if method is None:
+            msg = f"{type(node).__name__} is not supported"
+            raise UnsupportedExpressionError(msg)
+        return self._checked(method(node))
+
+    def _eval_Constant(self, node: ast.Constant) -> Any:  # noqa: N802
+        if not isinstance(node.value, (int, float, complex, str, bool, type(None))):
+            msg = f"{type(node.value).__name__} constants are not supported"
+            raise UnsupportedExpressionError(msg)
+        return node.value
+
+    def _eval_Name(self, node: ast.Name) -> Any:  # noqa: N802
+        if node.id in self.locals:
+            return self.locals[node.id]
+        if node.id in self.globals:
+            return self.globals[node.id]
+        msg = f"name '{node.id}' is not defined"
+        raise NameError(msg)
+
+    def _eval_BinOp(self, node: ast.BinOp) -> Any:  # noqa: N802
+        op = BINARY_OPERATORS.get(type(node.op))
+        if op is None:
+            msg = f"{type(node.op).__name__} is not supported"
+            raise UnsupportedExpressionError(msg)
+        left = self._eval(node.left)
+        right = self._eval(node.right)
+        self._check_binop(node.op, left, right)
+        return op(left, right)
+
+    def _check_binop(self, op: ast.operator, left: Any, right: Any) -> None:
+        """Reject operations whose result would be too large, before computing them."""
+        if isinstance(op, ast.Mod) and isinstance(left, (str, bytes)):
+            # printf-style formatting, where a width can make the result any size
+            msg = "String formatting is not supported"
+            raise UnsupportedExpressionError(msg)
+        if isinstance(op, ast.Pow) and isinstance(left, int) and isinstance(right, int) and right > 0:
+            bits = max(left.bit_length(), 1) * right
+        elif isinstance(op, ast.LShift) and isinstance(left, int) and isinstance(right, int):
+            bits = left.bit_length() + right
+        elif isinstance(op, ast.Mult) and isinstance(left, int) and isinstance(right, int):
+            bits = left.bit_length() + right.bit_length()
+        elif isinstance(op, ast.Mult) and isinstance(right, int) and not isinstance(left, (int, float, complex)):
+            bits = 0
+            if self._weight(left) * right > MAX_ITEMS:
+                msg = f"More than {MAX_ITEMS} items"
+                raise UnsupportedExpressionError(msg)
+        elif isinstance(op, ast.Mult) and isinstance(left, int):
+            self._check_binop(op, right, left)
+            return
+        else:
+            return
+        self._too_large(bits)
+
+    def _eval_UnaryOp(self, node: ast.UnaryOp) -> Any:  # noqa: N802
+        return UNARY_OPERATORS[type(node.op)](self._eval(node.operand))
+
+    def _eval_BoolOp(self, node: ast.BoolOp) -> Any:  # noqa: N802
+        value = None
+        for operand in node.values:
+            value = self._eval(operand)
+            if isinstance(node.op, ast.And) and not value:
+                return value
+            if isinstance(node.op, ast.Or) and value:
+                return value
+        return value
+
+    def _eval_Compare(self, node: ast.Compare) -> bool:  # noqa: N802
+        left = self._eval(node.left)
+        for op, comparator in zip(node.ops, node.comparators):
+            right = self._eval(comparator)
+            if not COMPARISONS[type(op)](left, right):
+                return False
+            left = right
+        return True
+
+    def _eval_IfExp(self, node: ast.IfExp) -> Any:  # noqa: N802
+        return self._eval(node.body) if self._eval(node.test) else self._eval(node.orelse)
+
+    def _eval_Call(self, node: ast.Call) -> Any:  # noqa: N802
+        func = self._eval(node.func)
+        if id(func) not in self.callables:
+            msg = "Only the math functions may be called"
+            raise UnsupportedExpressionError(msg)
+        if any(isinstance(arg, ast.Starred) for arg in node.args) or any(
+            keyword.arg is None for keyword in node.keywords
+        ):
+            msg = "Unpacking arguments is not supported"
+            raise UnsupportedExpressionError(msg)
+
+        args = [self._eval(arg) for arg in node.args]
+        kwargs = {keyword.arg: self._eval(keyword.value) for keyword in node.keywords}
+        return func(*args, **kwargs)
+
+    def _eval_Tuple(self, node: ast.Tuple) -> tuple:  # noqa: N802
+        return tuple(self._eval(elt) for elt in node.elts)
+
+    def _eval_List(self, node: ast.List) -> list:  # noqa: N802
+        return [self._eval(elt) for elt in node.elts]
+
+    def _eval_Set(self, node: ast.Set) -> set:  # noqa: N802
+        return {self._eval(elt) for elt in node.elts}
+
+    def _eval_Dict(self, node: ast.Dict) -> dict:  # noqa: N802
+        if any(key is None for key in node.keys):
+            msg = "Unpacking dicts is not supported"
+            raise UnsupportedExpressionError(msg)
+        return {self._eval(key): self._eval(value) for key, value in zip(node.keys, node.values)}
+
+    def _eval_Subscript(self, node: ast.Subscript) -> Any:  # noqa: N802
+        return self._eval(node.value)[self._eval(node.slice)]
+
+    def _eval_Slice(self, node: ast.Slice) -> slice:  # noqa: N802
+        return slice(
+            None if node.lower is None else self._eval(node.lower),
+            None if node.upper is None else self._eval(node.upper),
+            None if node.step is None else self._eval(node.step),
+        )
+
+
+def evaluate_math(code: str) -> str:
+    """Evaluate `code` with `MathEvaluator`, returning what it printed."""
+    return MathEvaluator().evaluate(code)
+
+
+def _serve(conn: Connection) -> None:
+    """The loop of a `MathWorker` process: evaluate each code received, and send back the result."""
+    while True:
+        try:
+            code = conn.recv()
+        except EOFError:
+            return
+        try:
+            result = (True, evaluate_math(code))
+        except Exception as err:  # noqa: BLE001
+            result = (False, err)
+        try:
+            conn.send(result)
+        except Exception as err:  # noqa: BLE001
+            # eg. an exception which cannot be pickled
+            conn.send((False, ValueError(str(err))))
+
+
+class MathProcess:
+    def __init__(self) -> None:
+        """A process running `_serve`, and the end of the pipe to it."""
+        self.conn, child = Pipe()
+        self.process = Process(target=_serve, args=(child,), daemon=True)
+        self.process.start()
+        child.close()
+
+    def kill(self) -> None:
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+
+class MathWorker:
+    def __init__(self, *, processes: int = 1, timeout: float = 1) -> None:
+        """
+        Runs `evaluate_math` in other processes, so that it never blocks the event loop.
+
+        `MathEvaluator` checks its limits between steps, which a single builtin
+        call it did not foresee could still exceed by far. Each evaluation has
+        a process to itself, and if it takes longer than `timeout` only that
+        process is killed, to be replaced for the next evaluation.
+
+        Args:
+        ----
+            processes (int): Processes evaluating at once.
+            timeout (float): Seconds an evaluation may take once it has a process.
+
+        """
+        self.timeout = timeout
+        self.semaphore = asyncio.Semaphore(processes)
+        self.idle: list[MathProcess] = []
+        self.killed = 0
+
+    async def evaluate(self, code: str) -> str:
+        """Evaluate `code`, raising `UnsupportedExpressionError` if it takes too long."""
+        async with self.semaphore:
+            worker = self.idle.pop() if self.idle else await asyncio.to_thread(MathProcess)
+            try:
+                worker.conn.send(code)
+                # the deadline only starts now that this evaluation has a process
+                finished = await asyncio.to_thread(worker.conn.poll, self.timeout)
+                if finished:
+                    ok, result = worker.conn.recv()
+            except BaseException:
+                # eg. cancelled, leaving a result in the pipe which the next evaluation would read
+                await asyncio.to_thread(worker.kill)
+                raise
+
+            if not finished:
+                self.killed += 1
+                await asyncio.to_thread(worker.kill)
+                msg = f"Took longer than {self.timeout:g}s"
+                raise UnsupportedExpressionError(msg)
+
+            self.idle.append(worker)
+            if not ok:
+                raise result
+            return result
+
+math_worker = MathWorker(processes=config.math_processes, timeout=config.math_timeout)
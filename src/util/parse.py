@@ -8,12 +8,10 @@ from urllib.parse import urlparse
 
 from fuzzywuzzy import fuzz
 
-from assets.color_db import COLOR_INDEX
+from src.types.piston import piston_catalog
+from src.util.color import COLOR_NAME_INDEX
 from src.util.regex import SLUG_REGEX
 
-if typing.TYPE_CHECKING:
-    from src.types.core import Vanir
-
 FuzzyT = typing.TypeVar("FuzzyT")
 T = typing.TypeVar("T")
 K = typing.TypeVar("K")
@@ -34,19 +32,8 @@ def find_ext(url: str) -> str:
     return filename[filename.rfind(".") + 1 :]
 
 
-def closest_color_name(start_hex: str) -> tuple[str, int]:
-    start = int(start_hex.strip("#"), 16)
-    best: tuple[str, int] | None = None
-    for col, (check_hex, _) in COLOR_INDEX.items():
-        if best is None:
-            best = col, abs(int(check_hex[1:], 16) - start)
-
-        dif = abs(int(check_hex[1:], 16) - start)
-
-        if dif < best[1]:
-            best = col, dif
-
-    return best
+def closest_color_name(start_hex: str) -> tuple[str, float]:
+    return COLOR_NAME_INDEX.nearest(start_hex)
 
 
 def ensure_slug(slug: str) -> str:
@@ -154,10 +141,7 @@ def soundex(string: str) -> str:
     return "".join(result)
 
 
-def language_from_codeblock(
-    bot: Vanir,
-    codeblock: str,
-) -> str | None:
+def language_from_codeblock(codeblock: str) -> str | None:
     # first, see if it's a codeblock
     if not codeblock.startswith("```"):
         return None
@@ -169,9 +153,4 @@ def language_from_codeblock(
 
     if not lang:
         return None
-    lang = lang.lower()
-
-    for pkg in bot.installed_piston_packages:
-        if lang == pkg.language or lang in pkg.aliases:
-            return pkg.language
-    return None
+    return piston_catalog.language(lang)
@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+import statistics
+from collections import deque
+
+
+class LatencyStats:
+    def __init__(self, window: int = 1000) -> None:
+        """Running count/total/max, and percentiles over the last `window` samples."""
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.recent: deque[float] = deque(maxlen=window)
+
+    def record(self, elapsed: float) -> None:
+        self.count += 1
+        self.total += elapsed
+        self.max = max(self.max, elapsed)
+        self.recent.append(elapsed)
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, pct: int) -> float:
+        if len(self.recent) < 2:
+            return self.recent[0] if self.recent else 0.0
+        return statistics.quantiles(self.recent, n=100, method="inclusive")[pct - 1]
+
+    def __str__(self) -> str:
+        return (
+            f"n={self.count} avg={self.mean*1000:.2f}ms p95={self.percentile(95)*1000:.2f}ms "
+            f"max={self.max*1000:.2f}ms"
+        )
+
+
+def hit_rate(hits: int, misses: int) -> str:
+    """Eg. "75.0% [3/4]", for the stats of a cache."""
+    lookups = hits + misses
+    return f"{hits / lookups:.1%} [{hits}/{lookups}]" if lookups else "n/a"